@@ -0,0 +1,116 @@
+"""Measure AST node memory and parse throughput with and without validators.
+
+Run with `python benchmarks/ast_construction.py [statements]`. For each
+dialect a program with 20k statements (by default) is tokenized once in a
+fresh interpreter and then parsed, best of three, with every field validator
+running during construction (`validators`, what `parser.parse` does by
+default), with validators skipped and one `ast.validate` pass over the
+finished tree (`deferred`), and with validation skipped altogether (`none`). Node memory is counted with `sys.getsizeof` over
+each node and, where it has one, its instance dictionary.
+"""
+from __future__ import print_function
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DIALECTS = ["eenie", "meeny"]
+STATEMENTS = 20000
+
+CHILD = """
+from __future__ import print_function
+
+import sys
+import time
+
+import attr
+
+import ast
+import parser
+from scanner import scan
+
+
+def nodes(program):
+    stack = [program]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, ast.ASTNode):
+            yield node
+            stack.extend(getattr(node, attribute.name)
+                         for attribute in attr.fields(type(node)))
+
+
+def node_size(node):
+    size = sys.getsizeof(node)
+    if hasattr(node, "__dict__"):
+        size += sys.getsizeof(node.__dict__)
+    return size
+
+
+def best_time(function):
+    best = None
+    for _ in range(3):
+        start = time.time()
+        function()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+tokens = list(scan(sys.stdin.read()))
+program = parser.parse(iter(tokens))
+all_nodes = list(nodes(program))
+print(len(all_nodes), sum(node_size(node) for node in all_nodes))
+for mode in sys.argv[1:]:
+    if mode == "validators":
+        parse = lambda: parser.parse(iter(tokens))
+    elif mode == "deferred":
+        parse = lambda: ast.validate(parser.parse(iter(tokens), False))
+    else:
+        parse = lambda: parser.parse(iter(tokens), False)
+    print(len(all_nodes) / best_time(parse))
+"""
+
+MODES = ["validators", "deferred", "none"]
+
+
+def generate(statements):
+    lines = ["program nodes has", "decls", "    int total, count", "body"]
+    for i in range(statements):
+        lines.append("    total <- total + count - %d" % i)
+        lines.append("    write (total)")
+    lines.append("end nodes")
+    return "\n".join(lines) + "\n"
+
+
+def measure(dialect, source):
+    proc = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-c", CHILD] + MODES,
+        cwd=os.path.join(ROOT, dialect),
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+    )
+    out, _ = proc.communicate(source.encode("ascii"))
+    if proc.returncode:
+        raise RuntimeError("parsing failed for %s" % dialect)
+    lines = out.decode("ascii").splitlines()
+    count, size = lines[0].split()
+    return int(count), int(size), [float(line) for line in lines[1:]]
+
+
+def main(statements):
+    source = generate(statements)
+    print("%-6s %8s %12s %-11s %14s" % (
+        "", "nodes", "bytes/node", "validation", "nodes/s"))
+    for dialect in DIALECTS:
+        count, size, rates = measure(dialect, source)
+        for mode, rate in zip(MODES, rates):
+            print("%-6s %8d %12.1f %-11s %14.0f" % (
+                dialect, count, size / float(count), mode, rate))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else STATEMENTS)
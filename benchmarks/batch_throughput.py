@@ -0,0 +1,59 @@
+"""Compare one interpreter per program with the batch runner.
+
+Run with `python -m benchmarks.batch_throughput [programs] [jobs]` from the
+repository root. 200 small generated meeny programs (by default) are run
+once with a fresh `parser.py` process each, one after another, and once
+through `batch.py` with `jobs` workers (all CPUs by default).
+"""
+from __future__ import print_function
+
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import generator
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIRECTORY = os.path.join(ROOT, "meeny")
+
+PROGRAMS = 200
+
+
+def main(programs, jobs):
+    directory = tempfile.mkdtemp()
+    try:
+        paths = []
+        for seed in range(programs):
+            path = os.path.join(directory, "p%d.meeny" % seed)
+            with open(path, "w") as f:
+                f.write(generator.generate("meeny", 50, seed=seed))
+            paths.append(path)
+        with open(os.devnull, "w") as devnull:
+            start = time.time()
+            for path in paths:
+                subprocess.check_call(
+                    [sys.executable, "-W", "ignore", "parser.py", path],
+                    cwd=DIRECTORY, stdout=devnull)
+            separate = time.time() - start
+            start = time.time()
+            subprocess.check_call(
+                [sys.executable, "-W", "ignore", "batch.py", directory,
+                 "--jobs", str(jobs)],
+                cwd=DIRECTORY, stdout=devnull)
+            batched = time.time() - start
+    finally:
+        shutil.rmtree(directory)
+    print("%d programs" % programs)
+    print("one process each: %8.3fs" % separate)
+    print("batch, %2d jobs:   %8.3fs  (x%.1f)" % (jobs, batched,
+                                                 separate / batched))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else PROGRAMS,
+         int(sys.argv[2]) if len(sys.argv) > 2 else
+         multiprocessing.cpu_count())
@@ -0,0 +1,95 @@
+"""Time arithmetic-heavy evaluation in eenie_rpython.
+
+Run with `python benchmarks/eenie_rpython_eval.py [statements] [binary]`. A
+straight-line program of 20k statements (by default), mixing additions,
+subtractions, multiplications and divisions of variables that stay small,
+is evaluated untranslated in a fresh interpreter, best of three, with output
+collected in memory. If the path of a translated `target-c` is given, the
+whole program is also run through it, best of three, with its output
+discarded.
+"""
+from __future__ import print_function
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STATEMENTS = 20000
+
+CHILD = """
+from __future__ import print_function
+
+import sys
+import time
+
+import output
+import parser
+import resolver
+from scanner import scan
+
+with open(sys.argv[1]) as f:
+    program = resolver.resolve(parser.parser.parse(scan(f.read())))
+output.stdout.collect()
+best = None
+for _ in range(3):
+    start = time.time()
+    program.eval(program.new_frame())
+    elapsed = time.time() - start
+    best = elapsed if best is None else min(best, elapsed)
+print(best)
+"""
+
+
+def generate(statements):
+    lines = ["program arithmetic has", "decls", "    int a, b, c", "body"]
+    for i in range(statements):
+        lines.append([
+            "    a <- %d * %d + b / 4" % (i % 30, i % 7),
+            "    c <- a * 3 - b + %d" % (i % 50),
+            "    b <- c / 2 - a + %d" % (i % 11),
+            "    write (a + b + c)",
+        ][i % 4])
+    lines.append("end arithmetic")
+    return "\n".join(lines) + "\n"
+
+
+def untranslated(path):
+    out = subprocess.check_output(
+        [sys.executable, "-W", "ignore", "-c", CHILD, path],
+        cwd=os.path.join(ROOT, "eenie_rpython"),
+    )
+    return float(out.decode("ascii").strip().splitlines()[-1])
+
+
+def translated(binary, path):
+    best = None
+    with open(os.devnull, "w") as devnull:
+        for _ in range(3):
+            start = time.time()
+            subprocess.check_call([binary, path], stdout=devnull)
+            elapsed = time.time() - start
+            best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(statements, binary):
+    fd, path = tempfile.mkstemp(suffix=".eenie")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(generate(statements))
+        print("untranslated eval: %8.3fs" % untranslated(path))
+        if binary is None:
+            print("translated run:    (pass the path of target-c to time it)")
+        else:
+            print("translated run:    %8.3fs" % translated(binary, path))
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else STATEMENTS,
+         sys.argv[2] if len(sys.argv) > 2 else None)
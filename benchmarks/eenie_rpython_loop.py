@@ -0,0 +1,56 @@
+"""Time eenie_rpython's loop-heavy `loop.eenie` program.
+
+Run with `python benchmarks/eenie_rpython_loop.py [binary ...]`. The program
+runs 100 inner iterations for each of `n` outer ones; `n` is fed through an
+inputs file. It is run untranslated with a small `n`, and with a large one
+through every translated binary given, such as `target-c` built with and
+without `--opt=jit`, keeping the best of three runs each.
+"""
+from __future__ import print_function
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIRECTORY = os.path.join(ROOT, "eenie_rpython")
+PROGRAM = os.path.join(DIRECTORY, "loop.eenie")
+
+UNTRANSLATED_N = 300
+TRANSLATED_N = 100000
+
+
+def best_time(command, n):
+    fd, inputs = tempfile.mkstemp()
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write("%d\n" % n)
+        best = None
+        for _ in range(3):
+            start = time.time()
+            out = subprocess.check_output(command + [PROGRAM, inputs],
+                                          cwd=DIRECTORY)
+            elapsed = time.time() - start
+            best = elapsed if best is None else min(best, elapsed)
+    finally:
+        os.remove(inputs)
+    return best, out.decode("ascii").split()[-1]
+
+
+def main(binaries):
+    runs = [("untranslated", [sys.executable, "-W", "ignore", "target.py"],
+             UNTRANSLATED_N)]
+    runs.extend((binary, [os.path.abspath(binary)], TRANSLATED_N)
+                for binary in binaries)
+    print("%-30s %8s %12s %14s" % ("interpreter", "n", "time (s)",
+                                   "iterations/s"))
+    for name, command, n in runs:
+        elapsed, result = best_time(command, n)
+        print("%-30s %8d %12.3f %14.0f   (total %s)" % (
+            name, n, elapsed, n * 100 / elapsed, result))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,77 @@
+"""Measure repeated runs of one meeny program through `embed`.
+
+Run with `python -m benchmarks.embed_throughput [runs]` from the repository
+root. A small program that reads two numbers and loops over them is
+compiled once per engine and run 5000 times (by default) with different
+inputs, and, for comparison, lexed, parsed and prepared again before each of
+200 runs. Results are in runs per second.
+"""
+from __future__ import print_function
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RUNS = 5000
+
+REPARSED_RUNS = 200
+
+PROGRAM = """
+program service has
+decls
+    int n, step, total, i
+body
+    read(n)
+    read(step)
+    total <- 0
+    i <- 0
+    while n > i do
+        if i % 3 = 0 then
+            total <- total + i * step
+        else
+            total <- total - step
+        endif
+        i <- i + 1
+    endwhile
+    writeln(total)
+end service
+"""
+
+CHILD = """
+from __future__ import print_function
+
+import sys
+import time
+
+import embed
+
+program = sys.stdin.read()
+runs, reparsed_runs = int(sys.argv[1]), int(sys.argv[2])
+for engine in ("tree", "vm", "python"):
+    executable = embed.compile(program, engine)
+    start = time.time()
+    for i in range(runs):
+        executable.run([10 + i % 7, i % 5])
+    compiled = runs / (time.time() - start)
+    start = time.time()
+    for i in range(reparsed_runs):
+        embed.compile(program, engine).run([10 + i % 7, i % 5])
+    reparsed = reparsed_runs / (time.time() - start)
+    print("%-8s %14.0f %14.0f" % (engine, compiled, reparsed))
+"""
+
+
+def main(runs):
+    print("%-8s %14s %14s" % ("engine", "compiled once", "reparsed"))
+    sys.stdout.flush()
+    proc = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-c", CHILD, str(runs),
+         str(REPARSED_RUNS)],
+        cwd=os.path.join(ROOT, "meeny"), stdin=subprocess.PIPE)
+    proc.communicate(PROGRAM.encode("ascii"))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else RUNS)
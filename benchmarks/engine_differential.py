@@ -0,0 +1,243 @@
+"""Check that every meeny engine runs random programs the same way.
+
+Run with `python -m benchmarks.engine_differential [programs] [seed]` from
+the repository root. 2000 random programs (by default) are generated from
+the seed, each with loops that always end, conditions, reads, writes and
+arithmetic that may divide by zero or read an unset variable. Some loops
+step a counter they multiply by other variables, so that the optimizer
+hoists invariants and reduces strength in them. Every program
+is run with the same inputs by the tree walker, the vm and the Python
+engine, each with and without `optimize`. All six runs must write the same
+output, prompt for the same reads, leave the same final values in their
+variables (temporaries the optimizer adds aside) and raise the same type of
+exception, if any.
+
+A quarter as many programs are then run over batches of input rows by the
+NumPy vector engine, when NumPy is installed, and every lane must write what
+the tree walker writes for its row, or raise the same type of exception.
+"""
+from __future__ import print_function
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROGRAMS = 2000
+
+CHILD = r"""
+from __future__ import print_function
+
+import random
+import sys
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+import cache
+import optimizer
+import output
+import parser
+import reader
+import scanner
+import vector
+
+VARIABLES = ["a", "b", "c", "d"]
+COUNTERS = ["k", "m"]
+OPERATORS = ["+", "-", "*", "/", "%", ">", "="]
+LANES = 40
+
+
+def expression(rng, depth):
+    if depth == 0 or rng.random() < 0.3:
+        choice = rng.random()
+        if choice < 0.4:
+            return str(rng.randint(0, 5))
+        elif choice < 0.5:
+            return "-%d" % rng.randint(0, 5)
+        return rng.choice(VARIABLES + ["i"])
+    if rng.random() < 0.1:
+        # What strength reduction applies to.
+        return "(i * %s)" % rng.choice(["a", "b", "c", "3", "-2"])
+    operator = rng.choice(OPERATORS)
+    if operator in ("/", "%") and rng.random() < 0.8:
+        # Most divisions are by a nonzero constant, or few programs would
+        # get far.
+        right = str(rng.choice([-3, -2, 1, 2, 3, 7]))
+    else:
+        right = expression(rng, depth - 1)
+    return "(%s %s %s)" % (expression(rng, depth - 1), operator, right)
+
+
+def statements(rng, count, depth):
+    lines = []
+    for _ in range(count):
+        choice = rng.random()
+        if choice < 0.4:
+            lines.append("%s <- %s" % (rng.choice(VARIABLES),
+                                       expression(rng, 3)))
+        elif choice < 0.5:
+            lines.append("write(%s)" % expression(rng, 2))
+        elif choice < 0.55:
+            lines.append("writeln(%s)" % expression(rng, 2))
+        elif choice < 0.6:
+            lines.append("read(%s)" % rng.choice(VARIABLES))
+        elif choice < 0.75 and depth:
+            # The counter of each nesting level is only changed by its loop.
+            counter = COUNTERS[depth - 1]
+            lines.append("%s <- %d" % (counter, rng.randint(0, 6)))
+            lines.append("while %s > 0 do %s %s <- %s - 1 endwhile" % (
+                counter, " ".join(statements(rng, 2, depth - 1)), counter,
+                counter))
+        elif choice < 0.8 and depth == 2:
+            lines.append(induction_loop(rng))
+        elif choice < 0.9 and depth:
+            condition = expression(rng, 2)
+            body = " ".join(statements(rng, 2, depth - 1))
+            if rng.random() < 0.5:
+                lines.append("if %s then %s endif" % (condition, body))
+            else:
+                lines.append("if %s then %s else %s endif" % (
+                    condition, body, " ".join(statements(rng, 2, depth - 1))))
+        else:
+            lines.append("writeln")
+    return lines
+
+
+def induction_loop(rng):
+    # A loop stepping `i` by a constant once per iteration, anywhere in its
+    # body, with `i` in its condition: the shape LoopOptimizer works on.
+    if rng.random() < 0.5:
+        step = rng.choice(["i <- i + %d" % rng.randint(1, 3), "i <- 2 + i"])
+        condition = rng.choice(["12 > i", "20 > i * 2", "30 > i * 3 + i * 3"])
+    else:
+        step = "i <- i - %d" % rng.randint(1, 3)
+        condition = rng.choice(["i > -12", "i * 2 > -20",
+                                "i * 2 + i * 2 > -30"])
+    body = statements(rng, rng.randint(1, 4), 1)
+    body.insert(rng.randint(0, len(body)), step)
+    return "i <- %d while %s do %s endwhile" % (rng.randint(-5, 5), condition,
+                                                " ".join(body))
+
+
+def program(rng):
+    # Some variables start unset, so that reading them fails.
+    lines = ["%s <- %d" % (variable, rng.randint(-3, 5))
+             for variable in VARIABLES + ["i"] if rng.random() < 0.95]
+    lines.extend(statements(rng, rng.randint(1, 8), 2))
+    return "program p has decls int a, b int c, d, i, k, m body %s end p" % (
+        " ".join(lines))
+
+
+class Recorder(reader.Inputs):
+    # Inputs that remembers the prompts it was asked with.
+    def __init__(self, values):
+        reader.Inputs.__init__(self, values)
+        self.prompts = []
+
+    def read(self, prompt):
+        self.prompts.append(prompt)
+        return reader.Inputs.read(self, prompt)
+
+
+def run(source, engine, optimize, inputs):
+    # The output, prompts, final variables and exception type of one run.
+    prepared = cache.prepare(source, engine, optimize)
+    collected = StringIO()
+    recorder = Recorder(inputs)
+    context = {}
+    error = None
+    previous_sink = output.redirect(collected)
+    previous_source = reader.redirect(recorder)
+    try:
+        if engine == "tree":
+            prepared.eval(context)
+        else:
+            prepared.run(context)
+    except Exception as e:
+        error = type(e).__name__
+    finally:
+        reader.redirect(previous_source)
+        output.redirect(previous_sink)
+    variables = dict((name, value) for name, value in context.items()
+                     if not name.startswith("_"))
+    return collected.getvalue(), recorder.prompts, variables, error
+
+
+def check(count, seed):
+    rng = random.Random(seed)
+    failures = 0
+    errors = 0
+    transformed = 0
+    for _ in range(count):
+        source = program(rng)
+        tree = parser.parse(scanner.scan(source))
+        optimized, _ = optimizer.optimize(tree)
+        transformed += len(optimized.decls) > len(tree.decls)
+        inputs = [rng.randint(-5, 5) for _ in range(50)]
+        expected = run(source, "tree", False, inputs)
+        errors += expected[3] is not None
+        for engine in ("tree", "vm", "python"):
+            for optimize in (False, True):
+                result = run(source, engine, optimize, inputs)
+                if result != expected:
+                    failures += 1
+                    print("%s%s differs on:\n%s\n%r\n%r" % (
+                        engine, " optimized" if optimize else "", source,
+                        expected, result))
+    print("%d programs, %d raising, %d with loops optimized, %d differing "
+          "runs" % (count, errors, transformed, failures))
+    return failures
+
+
+def check_vector(count, seed):
+    if vector.numpy is None:
+        print("NumPy is not installed; vector engine not checked")
+        return 0
+    rng = random.Random(seed)
+    failures = 0
+    for _ in range(count):
+        source = program(rng)
+        # Short rows run out of input and large values overflow int64, so
+        # that lanes fall back to the tree walker.
+        width = rng.choice([0, 1, 2, 4, 8, 16])
+        rows = [[rng.choice([rng.randint(-6, 9), rng.randint(-6, 9),
+                             2 ** 62, -2 ** 63]) for _ in range(width)]
+                for _ in range(LANES)]
+        outputs = vector.compile(source).run(
+            vector.numpy.array(rows, dtype=vector.numpy.int64).reshape(
+                LANES, width))
+        for row, result in zip(rows, outputs):
+            written, _, _, error = run(source, "tree", False, row)
+            if isinstance(result, Exception):
+                same = type(result).__name__ == error
+            else:
+                same = error is None and result == written
+            if not same:
+                failures += 1
+                print("vector differs on:\n%s\n%r\n%r %r" % (
+                    source, row, result, (written, error)))
+    print("%d programs over %d lanes, %d differing lanes" % (count, LANES,
+                                                             failures))
+    return failures
+
+
+failures = check(int(sys.argv[1]), int(sys.argv[2]))
+failures += check_vector(int(sys.argv[1]) // 4, int(sys.argv[2]))
+sys.exit(1 if failures else 0)
+"""
+
+
+def main(programs, seed):
+    return subprocess.call(
+        [sys.executable, "-W", "ignore", "-c", CHILD, str(programs),
+         str(seed)],
+        cwd=os.path.join(ROOT, "meeny"))
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else PROGRAMS,
+                  int(sys.argv[2]) if len(sys.argv) > 2 else 0))
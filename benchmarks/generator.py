@@ -0,0 +1,164 @@
+"""Seeded generator of synthetic eenie, meeny and eenie_rpython programs.
+
+`generate` returns the source of a program for one dialect. The same
+arguments always produce the same program under the same Python version;
+bump `GENERATOR_VERSION` whenever a change would produce different programs,
+so that benchmark results taken with different generators are not compared.
+
+Every expression contains at most one variable, conditions compare two
+unparenthesized arithmetic expressions, and every assignment reduces
+its result modulo `MODULUS` (eenie, which has no multiplication, only adds
+and subtracts constants), so values stay small in every interpreter and none
+of them overflows or spends its time on big integers. Loops run a fixed
+`trip_count` times on counters of their own.
+"""
+from __future__ import print_function
+
+import random
+import sys
+
+GENERATOR_VERSION = 2
+
+DIALECTS = ["eenie", "meeny", "eenie_rpython"]
+
+MODULUS = 1009
+
+MAX_NESTING = 2
+
+
+class Generator(object):
+    def __init__(self, dialect, statements=100, depth=3, declarations=8,
+                 trip_count=10, seed=0):
+        if dialect not in DIALECTS:
+            raise ValueError("Unknown dialect %s" % dialect)
+        self.dialect = dialect
+        self.statements = statements
+        self.depth = depth
+        self.variables = ["v%d" % i for i in range(max(1, declarations))]
+        self.trip_count = trip_count
+        self.random = random.Random(seed)
+        self.counters = []
+        self.control = dialect != "eenie"
+        self.operators = ["+", "-"] + (["*", "/"] if self.control else [])
+
+    def generate(self):
+        statements = self.block(self.statements, 1, 0)
+        body = ["    %s <- %d" % (name, i)
+                for i, name in enumerate(self.variables)]
+        body.extend("    %s <- 0" % name for name in self.counters)
+        body.extend(statements)
+        names = self.variables + self.counters
+        if self.dialect == "eenie_rpython":
+            names = names + ["t"]
+        lines = ["program generated has", "decls"]
+        for i in range(0, len(names), 8):
+            lines.append("    int " + ", ".join(names[i:i + 8]))
+        lines.append("body")
+        lines.extend(body)
+        lines.append("end generated")
+        return "\n".join(lines) + "\n"
+
+    def block(self, budget, indent, nesting):
+        lines = []
+        while budget > 0:
+            used, statement = self.statement(budget, indent, nesting)
+            lines.extend(statement)
+            budget -= used
+        return lines
+
+    def statement(self, budget, indent, nesting):
+        prefix = "    " * indent
+        choice = self.random.random()
+        if self.control and nesting < MAX_NESTING and budget >= 3:
+            if choice < 0.1:
+                return self.loop(budget, indent, nesting)
+            elif choice < 0.25:
+                return self.conditional(budget, indent, nesting)
+        if choice > 0.9:
+            return 1, ["%swriteln (%s)" % (
+                prefix, self.random.choice(self.variables))]
+        return 1, self.assignment(prefix)
+
+    def assignment(self, prefix):
+        target = self.random.choice(self.variables)
+        value = self.expression(self.depth,
+                                self.random.choice(self.variables))
+        if self.dialect == "meeny":
+            return ["%s%s <- (%s) %% %d" % (prefix, target, value, MODULUS)]
+        elif self.dialect == "eenie_rpython":
+            # No modulo operator: reduce through a temporary instead.
+            return ["%st <- %s" % (prefix, value),
+                    "%s%s <- t - ((t / %d) * %d)" % (prefix, target, MODULUS,
+                                                    MODULUS)]
+        return ["%s%s <- %s" % (prefix, target, value)]
+
+    def loop(self, budget, indent, nesting):
+        prefix = "    " * indent
+        counter = "k%d" % len(self.counters)
+        self.counters.append(counter)
+        size = self.random.randint(1, min(budget - 2, 8))
+        lines = ["%s%s <- 0" % (prefix, counter),
+                 "%swhile %d > %s + 1 do" % (prefix, self.trip_count + 1,
+                                             counter)]
+        lines.extend(self.block(size, indent + 1, nesting + 1))
+        lines.append("%s    %s <- %s + 1" % (prefix, counter, counter))
+        lines.append("%sendwhile" % prefix)
+        return size + 2, lines
+
+    def conditional(self, budget, indent, nesting):
+        prefix = "    " * indent
+        # Arithmetic on both sides, so that precedence against the
+        # comparison is exercised.
+        left = self.expression(1, self.random.choice(self.variables))
+        right = self.expression(1, self.random.choice(self.variables))
+        operator = self.random.choice([">", "="])
+        size = self.random.randint(1, min(budget - 1, 6))
+        lines = ["%sif %s %s %s then" % (prefix, left.strip("()"), operator,
+                                         right.strip("()"))]
+        lines.extend(self.block(size, indent + 1, nesting + 1))
+        used = size + 1
+        if used < budget and self.random.random() < 0.5:
+            size = self.random.randint(1, min(budget - used, 6))
+            lines.append("%selse" % prefix)
+            lines.extend(self.block(size, indent + 1, nesting + 1))
+            used += size
+        lines.append("%sendif" % prefix)
+        return used, lines
+
+    def expression(self, depth, variable):
+        """An expression nested `depth` deep using `variable` once."""
+        if depth == 0:
+            if variable is not None:
+                return variable
+            return str(self.random.randint(0, 99))
+        operator = self.random.choice(self.operators)
+        if operator in ("*", "/"):
+            # Only ever multiply or divide by a small positive constant.
+            return "(%s %s %d)" % (self.expression(depth - 1, variable),
+                                   operator, self.random.randint(1, 9))
+        left = self.expression(depth - 1, variable)
+        right = self.expression(depth - 1, None)
+        if self.random.random() < 0.5:
+            left, right = right, left
+        return "(%s %s %s)" % (left, operator, right)
+
+
+def generate(dialect, statements=100, depth=3, declarations=8, trip_count=10,
+             seed=0):
+    return Generator(dialect, statements, depth, declarations, trip_count,
+                     seed).generate()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument("dialect", choices=DIALECTS)
+    argparser.add_argument("--statements", type=int, default=100)
+    argparser.add_argument("--depth", type=int, default=3)
+    argparser.add_argument("--declarations", type=int, default=8)
+    argparser.add_argument("--trip-count", type=int, default=10)
+    argparser.add_argument("--seed", type=int, default=0)
+    args = argparser.parse_args()
+    sys.stdout.write(generate(args.dialect, args.statements, args.depth,
+                              args.declarations, args.trip_count, args.seed))
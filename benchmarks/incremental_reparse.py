@@ -0,0 +1,205 @@
+"""Check `incremental.reparse` against full parses and time both.
+
+Run with `python -m benchmarks.incremental_reparse [edits]` from the
+repository root. First 2000 random edits (by default) are applied to a
+generated program, each one reparsed incrementally and checked against a
+full parse of the edited source: the trees, their source positions and the
+tokens must be identical, and an edit the full parse rejects must make
+`reparse` raise the same error. Then a one-character edit inside a statement
+is timed on programs of growing size, incrementally and by a full parse.
+"""
+from __future__ import print_function
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+EDITS = 2000
+
+CHILD = r"""
+from __future__ import print_function
+
+import random
+import sys
+import time
+
+import attr
+
+import ast
+import incremental
+
+SNIPPETS = [" ", "\n", "x", "y1", "7", "42", "-", "+", "*", "<-", "(", ")",
+            "x <- x + 1\n", "writeln(y1)\n", "writeln\n", "read(x)\n",
+            "while x > 0 do x <- x - 1 endwhile\n",
+            "if x = 1 then y1 <- 2 else y1 <- 3 endif\n",
+            "if y1 > x then writeln endif\n", "while", "do", "endwhile",
+            "if", "then", "else", "endif", "write(", "%", "@"]
+
+
+def statement(rng, depth):
+    choice = rng.randrange(9 if depth < 3 else 6)
+    if choice == 0:
+        return "read(x)"
+    elif choice == 1:
+        return "writeln"
+    elif choice in (2, 3):
+        return "write(%s)" % expression(rng)
+    elif choice in (4, 5):
+        return "%s <- %s" % (rng.choice(["x", "y1"]), expression(rng))
+    elif choice == 6:
+        return "while %s do\n%s\nendwhile" % (expression(rng),
+                                              statements(rng, depth + 1))
+    elif choice == 7:
+        return "if %s then\n%s\nendif" % (expression(rng),
+                                          statements(rng, depth + 1))
+    return "if %s then\n%s\nelse\n%s\nendif" % (
+        expression(rng), statements(rng, depth + 1),
+        statements(rng, depth + 1))
+
+
+def expression(rng, depth=0):
+    if depth > 2 or rng.random() < 0.4:
+        return rng.choice(["x", "y1", "3", "17", "-2"])
+    return "%s %s %s" % (expression(rng, depth + 1), rng.choice("+-*/%>="),
+                         expression(rng, depth + 1))
+
+
+def statements(rng, depth, count=None):
+    count = count or rng.randint(1, 4)
+    return "\n".join("    " * depth + statement(rng, depth)
+                     for _ in range(count))
+
+
+def program(rng, count=None):
+    return "program p has\ndecls\n    int x, y1\nbody\n%s\nend p\n" % (
+        statements(rng, 1, count))
+
+
+# A random edit, as (offset, removed, inserted). Half of them mostly keep
+# the program valid.
+def edit(rng, source):
+    choice = rng.randrange(6)
+    lines = source.splitlines(True)
+    if choice == 0 and len(lines) > 5:
+        # Insert a statement at the start of a line.
+        line = rng.randrange(4, len(lines) - 1)
+        return len("".join(lines[:line])), 0, statement(rng, 3) + "\n"
+    elif choice == 1:
+        # Change a number.
+        digits = [i for i, c in enumerate(source) if c.isdigit()]
+        if digits:
+            return rng.choice(digits), 1, str(rng.randrange(10))
+    elif choice == 2:
+        # Delete a simple statement on a line of its own.
+        simple = [line for line in range(4, len(lines) - 1)
+                  if lines[line].split()[:1] in (["x"], ["y1"], ["writeln"])]
+        if simple:
+            line = rng.choice(simple)
+            return len("".join(lines[:line])), len(lines[line]), ""
+    offset = rng.randint(0, len(source))
+    removed = min(rng.choice([0, 0, 1, 2, 5, 20]), len(source) - offset)
+    return offset, removed, rng.choice(SNIPPETS + [""])
+
+
+def positions(node, found):
+    if isinstance(node, list):
+        for child in node:
+            positions(child, found)
+    elif isinstance(node, ast.ASTNode):
+        position = getattr(node, "source_pos", None)
+        if position is not None:
+            found.append((position.idx, position.lineno, position.colno))
+        for attribute in attr.fields(type(node)):
+            positions(getattr(node, attribute.name), found)
+    return found
+
+
+def describe_tokens(tokens):
+    return [(token.name, token.value, token.source_pos.idx,
+             token.source_pos.lineno, token.source_pos.colno)
+            for token in tokens]
+
+
+def check(edits):
+    rng = random.Random(0)
+    source = program(rng, 12)
+    tree, tokens = incremental.parse(source)
+    accepted = rejected = 0
+    for _ in range(edits):
+        if rng.random() < 0.05:
+            source = program(rng, rng.randint(1, 12))
+            tree, tokens = incremental.parse(source)
+        offset, removed, inserted = edit(rng, source)
+        new_source = source[:offset] + inserted + source[offset + removed:]
+        try:
+            expected = incremental.parse(new_source)
+        except Exception as e:
+            expected = e
+        try:
+            result = incremental.reparse(tree, tokens, source, offset,
+                                         removed, inserted)
+        except Exception as e:
+            assert isinstance(expected, Exception), (source, new_source, e)
+            assert type(e) is type(expected), (new_source, e, expected)
+            rejected += 1
+            continue
+        assert not isinstance(expected, Exception), (new_source, expected)
+        tree, tokens, source = result
+        assert source == new_source
+        assert tree == expected[0], (source, tree, expected[0])
+        assert positions(tree, []) == positions(expected[0], []), source
+        assert describe_tokens(tokens) == describe_tokens(expected[1]), source
+        accepted += 1
+    print("%d edits reparsed, %d rejected, all as by a full parse" % (
+        accepted, rejected))
+
+
+def timed(run, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        run()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def compare(count):
+    rng = random.Random(count)
+    source = program(rng, count)
+    offset = source.index("<- ", len(source) // 2) + 3
+    state = [source, incremental.parse(source)]
+
+    def edit():
+        # Add a term in front of an expression, then delete it again.
+        source, (tree, tokens) = state
+        tree, tokens, source = incremental.reparse(tree, tokens, source,
+                                                   offset, 0, "1 + ")
+        tree, tokens, source = incremental.reparse(tree, tokens, source,
+                                                   offset, 4, "")
+        state[:] = [source, (tree, tokens)]
+
+    reparse = timed(edit, 20) / 2
+    full = timed(lambda: incremental.parse(source), 3)
+    print("%10d %10d %12.3f %12.3f" % (count, len(source), reparse * 1000,
+                                       full * 1000))
+
+
+check(int(sys.argv[1]))
+print("%10s %10s %12s %12s" % ("statements", "characters", "reparse ms",
+                               "full ms"))
+for count in (100, 1000, 10000):
+    compare(count)
+"""
+
+
+def main(edits):
+    return subprocess.call(
+        [sys.executable, "-W", "ignore", "-c", CHILD, str(edits)],
+        cwd=os.path.join(ROOT, "meeny"))
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else EDITS))
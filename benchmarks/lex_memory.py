@@ -0,0 +1,82 @@
+"""Compare the peak memory of lexing a whole source against lexing a stream.
+
+Run with `python benchmarks/lex_memory.py [megabytes ...]`. For each size a
+meeny program of that many megabytes is generated, and a fresh interpreter
+counts its tokens either with `lex(f.read())` or with `lex_stream(f)`. The
+lexing time and the peak RSS of the child are reported; with `lex_stream`
+the peak should not grow with the size of the program.
+"""
+from __future__ import print_function
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SIZES = [1, 10]
+
+CHILD = """
+from __future__ import print_function
+
+import resource
+import sys
+import time
+
+from lexer import lex, lex_stream
+
+start = time.time()
+with open(sys.argv[2]) as f:
+    if sys.argv[1] == "lex":
+        tokens = lex(f.read())
+    else:
+        tokens = lex_stream(f)
+    count = sum(1 for _ in tokens)
+elapsed = time.time() - start
+print(elapsed, count, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+STATEMENTS = (b"    a <- a + 12345\n"
+              b"    if a >= limit then write (a) endif\n")
+
+
+def generate(path, megabytes):
+    statement_count = megabytes * (1 << 20) // len(STATEMENTS)
+    with open(path, "wb") as f:
+        f.write(b"program generated has\ndecls\n    int a, limit\nbody\n")
+        block = STATEMENTS * 1024
+        for _ in range(statement_count // 1024):
+            f.write(block)
+        f.write(STATEMENTS * (statement_count % 1024))
+        f.write(b"end generated\n")
+
+
+def measure(entry, path):
+    out = subprocess.check_output(
+        [sys.executable, "-W", "ignore", "-c", CHILD, entry, path],
+        cwd=os.path.join(ROOT, "meeny"),
+    )
+    elapsed, count, rss = out.decode("ascii").split()
+    return float(elapsed), int(count), int(rss)
+
+
+def main(sizes):
+    print("%6s %-11s %10s %12s %14s" % (
+        "MB", "entry", "tokens", "lex (s)", "peak RSS (MB)"))
+    directory = tempfile.mkdtemp()
+    try:
+        for megabytes in sizes:
+            path = os.path.join(directory, "generated.meeny")
+            generate(path, megabytes)
+            for entry in ("lex", "lex_stream"):
+                elapsed, count, rss = measure(entry, path)
+                print("%6d %-11s %10d %12.2f %14.1f" % (
+                    megabytes, entry, count, elapsed, rss / 1024.0))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
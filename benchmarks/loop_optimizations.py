@@ -0,0 +1,86 @@
+"""Measure the meeny loop optimizations on every engine.
+
+Run with `python -m benchmarks.loop_optimizations` from the repository root.
+A loop that recomputes invariant expressions and multiplies its counter by
+constants is run by each engine after constant folding only, and after the
+loop-invariant code motion and strength reduction of `LoopOptimizer` as
+well. Both runs must write the same output. Results are in seconds, best of
+three.
+"""
+from __future__ import print_function
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROGRAM = """
+program loops has
+decls
+    int n, base, width, i, total, row
+body
+    read(n)
+    read(base)
+    read(width)
+    i <- 0
+    total <- 0
+    while n > i do
+        row <- i * 8
+        total <- total + (width * 4 + base) % 1000 + i * 8 - row
+        if (i * 8) % 3 = 0 then
+            total <- total - (base * base) / 7
+        endif
+        i <- i + 1
+    endwhile
+    writeln(total)
+end loops
+"""
+
+CHILD = """
+from __future__ import print_function
+
+import sys
+import time
+
+import cache
+import embed
+import lexer
+import optimizer
+import parser
+
+program = parser.parse(lexer.lex(sys.stdin.read()))
+folded = optimizer.Optimizer(program).optimize()
+optimized, _ = optimizer.optimize(program)
+inputs = [int(argument) for argument in sys.argv[1:]]
+for engine in ("tree", "vm", "python"):
+    times = []
+    outputs = []
+    for tree in (folded, optimized):
+        executable = embed.Executable(tree.name, engine,
+                                      cache.engines[engine](tree))
+        best = None
+        for _ in range(3):
+            start = time.time()
+            output = executable.run(inputs)
+            elapsed = time.time() - start
+            best = elapsed if best is None else min(best, elapsed)
+        times.append(best)
+        outputs.append(output)
+    assert outputs[0] == outputs[1], outputs
+    print("%-8s %10.3f %10.3f %7.2fx" % (engine, times[0], times[1],
+                                          times[0] / times[1]))
+"""
+
+
+def main():
+    print("%-8s %10s %10s %8s" % ("engine", "folded", "loops", "speedup"))
+    sys.stdout.flush()
+    proc = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-c", CHILD, "200000", "37", "12"],
+        cwd=os.path.join(ROOT, "meeny"), stdin=subprocess.PIPE)
+    proc.communicate(PROGRAM.encode("ascii"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Compare the meeny execution engines on loop-heavy programs.
+
+Run with `python benchmarks/meeny_engines.py`. Program output is captured, and
+the final variable values of every engine are checked against the plain tree
+walker. Speedups are relative to the tree walker.
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "meeny"))
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore")
+    import lexer  # noqa: E402
+    import parser  # noqa: E402
+    import resolver  # noqa: E402
+    import transpile  # noqa: E402
+    import vm  # noqa: E402
+
+
+PROGRAMS = {
+    "sum": """
+program sum has
+decls
+    int i, s
+body
+    i <- 300000
+    s <- 0
+    while i > 0 do
+        s <- s + (i * i) % 7
+        i <- i - 1
+    endwhile
+    writeln(s)
+end sum
+""",
+    "collatz": """
+program collatz has
+decls
+    int n, x, steps
+body
+    n <- 3000
+    steps <- 0
+    while n > 1 do
+        x <- n
+        while x > 1 do
+            if x % 2 = 0 then
+                x <- x / 2
+            else
+                x <- 3 * x + 1
+            endif
+            steps <- steps + 1
+        endwhile
+        n <- n - 1
+    endwhile
+    writeln(steps)
+end collatz
+""",
+    "primes": """
+program primes has
+decls
+    int n, d, prime, count
+body
+    n <- 2
+    count <- 0
+    while 4000 > n do
+        d <- 2
+        prime <- 1
+        while n > d * d - 1 do
+            if n % d = 0 then
+                prime <- 0
+            endif
+            d <- d + 1
+        endwhile
+        count <- count + prime
+        n <- n + 1
+    endwhile
+    writeln(count)
+end primes
+""",
+}
+
+
+def prepare_tree(program):
+    return program.eval
+
+
+def prepare_resolved(program):
+    return resolver.resolve(program).eval
+
+
+def prepare_vm(program):
+    return vm.compile_program(program).run
+
+
+def prepare_python(program):
+    return transpile.compile_program(program).run
+
+
+ENGINES = [
+    ("tree", prepare_tree),
+    ("resolved", prepare_resolved),
+    ("vm", prepare_vm),
+    ("python", prepare_python),
+]
+
+
+def timed(run):
+    stdout = sys.stdout
+    sys.stdout = StringIO()
+    try:
+        context = {}
+        start = time.time()
+        run(context)
+        return time.time() - start, context
+    finally:
+        sys.stdout = stdout
+
+
+def main(repeat=3):
+    print("%-10s" % "program" + "".join(
+        "%16s" % ("%s (s)" % name) for name, _ in ENGINES))
+    for name in sorted(PROGRAMS):
+        program = parser.parser.parse(lexer.lex(PROGRAMS[name]))
+        line = "%-10s" % name
+        baseline = expected = None
+        for engine, prepare in ENGINES:
+            run = prepare(program)
+            elapsed, context = min(timed(run) for _ in range(repeat))
+            if baseline is None:
+                baseline, expected = elapsed, context
+                line += "%16.3f" % elapsed
+            else:
+                assert context == expected, (engine, context, expected)
+                line += "%9.3f %5.1fx" % (elapsed, baseline / elapsed)
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Check that parse time grows linearly with program size.
+
+Run with `python benchmarks/parse_scaling.py`. For each dialect a program with
+1k, 10k and 100k statements (and a proportional number of declarations) is
+parsed in a fresh interpreter, keeping the best of three runs. The script
+exits non-zero if a tenfold larger program takes more than `MAX_RATIO` times
+as long to parse.
+"""
+from __future__ import print_function
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DIALECTS = ["eenie", "meeny"]
+SIZES = [1000, 10000, 100000]
+MAX_RATIO = 15.0
+
+CHILD = """
+import sys, time
+from lexer import lex
+import parser
+source = sys.stdin.read()
+tokens = list(lex(source))
+best = None
+for _ in range(3):
+    start = time.time()
+    parser.parser.parse(iter(tokens))
+    elapsed = time.time() - start
+    best = elapsed if best is None else min(best, elapsed)
+print(best)
+"""
+
+
+def generate(statements):
+    names = ["v%d" % i for i in range(max(1, statements // 10))]
+    lines = ["program scaling has", "decls"]
+    for i in range(0, len(names), 10):
+        lines.append("    int " + ", ".join(names[i:i + 10]))
+    lines.append("body")
+    for i in range(statements):
+        lines.append("    %s <- %s + %d" % (
+            names[i % len(names)], names[(i * 7) % len(names)], i))
+    lines.append("end scaling")
+    return "\n".join(lines) + "\n"
+
+
+def time_parse(dialect, source):
+    proc = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-c", CHILD],
+        cwd=os.path.join(ROOT, dialect),
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+    )
+    out, _ = proc.communicate(source.encode("ascii"))
+    if proc.returncode:
+        raise RuntimeError("parse failed for %s" % dialect)
+    return float(out.decode("ascii").strip().splitlines()[-1])
+
+
+def main():
+    ok = True
+    for dialect in DIALECTS:
+        previous = None
+        for size in SIZES:
+            elapsed = time_parse(dialect, generate(size))
+            line = "%-6s %7d statements %8.3fs" % (dialect, size, elapsed)
+            if previous is not None:
+                ratio = elapsed / previous
+                line += "  x%.1f" % ratio
+                if ratio > MAX_RATIO:
+                    line += "  (superlinear)"
+                    ok = False
+            print(line)
+            previous = elapsed
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
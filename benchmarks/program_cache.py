@@ -0,0 +1,73 @@
+"""Time preparing a meeny program with and without the program cache.
+
+Run with `python -m benchmarks.program_cache [statements]` from the
+repository root. A generated program of 2000 statements (by default) is
+prepared for every engine, best of five: straight from the source, through
+a cache that misses and stores it, and through the same cache once it
+holds the program.
+"""
+from __future__ import print_function
+
+import os
+import subprocess
+import sys
+
+from benchmarks import generator
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STATEMENTS = 2000
+
+CHILD = """
+from __future__ import print_function
+
+import shutil
+import sys
+import tempfile
+import time
+
+import cache
+
+source = sys.stdin.read()
+
+
+def best(function):
+    result = None
+    for _ in range(5):
+        start = time.time()
+        function()
+        elapsed = time.time() - start
+        result = elapsed if result is None else min(result, elapsed)
+    return result
+
+
+directory = tempfile.mkdtemp()
+try:
+    for engine in sorted(cache.engines):
+        def miss():
+            programs = cache.ProgramCache(directory)
+            programs.clear()
+            programs.load(source, engine)
+
+        def hit():
+            cache.ProgramCache(directory).load(source, engine)
+
+        print("%-8s %10.4fs %10.4fs %10.4fs" % (
+            engine, best(lambda: cache.prepare(source, engine)), best(miss),
+            best(hit)))
+finally:
+    shutil.rmtree(directory)
+"""
+
+
+def main(statements):
+    source = generator.generate("meeny", statements)
+    print("%-8s %11s %11s %11s" % ("engine", "uncached", "miss", "hit"))
+    proc = subprocess.Popen([sys.executable, "-W", "ignore", "-c", CHILD],
+                            cwd=os.path.join(ROOT, "meeny"),
+                            stdin=subprocess.PIPE)
+    proc.communicate(source.encode("ascii"))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else STATEMENTS)
@@ -0,0 +1,256 @@
+"""Time lexing, parsing and evaluation of generated programs in every engine.
+
+Run with `python -m benchmarks.runner [options]` from the repository root.
+For every dialect and every requested program size a program is generated by
+`benchmarks.generator`, and a fresh interpreter for that dialect times, for
+each of its engines:
+
+- `lex`: tokenizing the source with the scanner the CLI uses,
+- `parse`: building the AST from those tokens,
+- `prepare`: resolving or compiling the AST for the engine,
+- `eval`: running the prepared program with its output discarded.
+
+Each phase runs `--warmup` times untimed and `--repeat` times timed. The
+results, with every sample and the parameters needed to regenerate the
+programs, are written as JSON to `--output` (stdout by default). Pass
+`--baseline` with an earlier result file to compare medians phase by phase;
+the runner exits non-zero if any phase got slower by more than
+`--threshold`.
+"""
+from __future__ import division, print_function
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+
+from benchmarks import generator
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCHEMA_VERSION = 1
+
+ENGINES = {
+    "eenie": ["tree"],
+    "meeny": ["tree", "vm", "python"],
+    "eenie_rpython": ["tree"],
+}
+
+CHILD = """
+import json
+import sys
+import time
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+import output
+import parser
+import resolver
+from scanner import scan
+
+dialect, engines, warmup, repeat = json.loads(sys.argv[1])
+source = sys.stdin.read()
+
+if dialect == "eenie_rpython":
+    parse = parser.parser.parse
+
+    def prepare(engine, program):
+        return resolver.resolve(program)
+
+    def evaluate(program):
+        output.stdout.collected = []
+        program.eval(program.new_frame())
+
+    output.stdout.collect()
+else:
+    parse = parser.parse
+
+    def prepare(engine, program):
+        if engine == "vm":
+            import vm
+            return vm.compile_program(program)
+        elif engine == "python":
+            import transpile
+            return transpile.compile_program(program)
+        return resolver.resolve(program)
+
+    def evaluate(program):
+        output.redirect(StringIO())
+        if hasattr(program, "run"):
+            program.run({})
+        else:
+            program.eval({})
+
+
+def measure(function):
+    for _ in range(warmup):
+        result = function()
+    samples = []
+    for _ in range(repeat):
+        start = time.time()
+        result = function()
+        samples.append(time.time() - start)
+    return result, samples
+
+
+tokens, lex_samples = measure(lambda: list(scan(source)))
+program, parse_samples = measure(lambda: parse(iter(tokens)))
+results = {}
+for engine in engines:
+    prepared, prepare_samples = measure(lambda: prepare(engine, program))
+    _, eval_samples = measure(lambda: evaluate(prepared))
+    results[engine] = {
+        "lex": lex_samples,
+        "parse": parse_samples,
+        "prepare": prepare_samples,
+        "eval": eval_samples,
+    }
+print(json.dumps({"tokens": len(tokens), "engines": results}))
+"""
+
+PHASES = ["lex", "parse", "prepare", "eval"]
+
+
+def median(samples):
+    ordered = sorted(samples)
+    middle = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[middle]
+    return (ordered[middle - 1] + ordered[middle]) / 2
+
+
+def summarize(samples):
+    return {
+        "min": min(samples),
+        "median": median(samples),
+        "mean": sum(samples) / len(samples),
+        "samples": samples,
+    }
+
+
+def run_dialect(dialect, source, warmup, repeat):
+    proc = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-c", CHILD,
+         json.dumps([dialect, ENGINES[dialect], warmup, repeat])],
+        cwd=os.path.join(ROOT, dialect),
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+    )
+    out, _ = proc.communicate(source.encode("ascii"))
+    if proc.returncode:
+        raise RuntimeError("benchmark failed for %s" % dialect)
+    return json.loads(out.decode("ascii").strip().splitlines()[-1])
+
+
+def revision():
+    try:
+        out = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT,
+                                      stderr=subprocess.STDOUT)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.decode("ascii").strip()
+
+
+def run(dialects, sizes, depth, declarations, trip_count, seed, warmup,
+        repeat):
+    results = []
+    for dialect in dialects:
+        for statements in sizes:
+            parameters = {
+                "statements": statements,
+                "depth": depth,
+                "declarations": declarations,
+                "trip_count": trip_count,
+                "seed": seed,
+            }
+            source = generator.generate(dialect, **parameters)
+            measured = run_dialect(dialect, source, warmup, repeat)
+            for engine in ENGINES[dialect]:
+                samples = measured["engines"][engine]
+                results.append({
+                    "dialect": dialect,
+                    "engine": engine,
+                    "program": dict(parameters, bytes=len(source),
+                                    tokens=measured["tokens"]),
+                    "phases": dict((phase, summarize(samples[phase]))
+                                   for phase in PHASES),
+                })
+    return {
+        "schema": SCHEMA_VERSION,
+        "generator": generator.GENERATOR_VERSION,
+        "revision": revision(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "warmup": warmup,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def key(result):
+    program = result["program"]
+    return (result["dialect"], result["engine"], program["statements"],
+            program["depth"], program["declarations"], program["trip_count"],
+            program["seed"])
+
+
+def compare(baseline, current, threshold):
+    """Print the median ratio of every phase; return the regressions."""
+    if (baseline["schema"], baseline["generator"]) != (
+            current["schema"], current["generator"]):
+        raise ValueError("Results come from different benchmark versions")
+    previous = dict((key(result), result) for result in baseline["results"])
+    regressions = []
+    for result in current["results"]:
+        old = previous.get(key(result))
+        if old is None:
+            continue
+        for phase in PHASES:
+            before = old["phases"][phase]["median"]
+            after = result["phases"][phase]["median"]
+            ratio = after / before if before else 1.0
+            line = "%-14s %-7s %7d %-8s %10.4fs %10.4fs  x%.2f" % (
+                result["dialect"], result["engine"],
+                result["program"]["statements"], phase, before, after, ratio)
+            if ratio > threshold:
+                line += "  (regression)"
+                regressions.append(line)
+            print(line, file=sys.stderr)
+    return regressions
+
+
+def main():
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument("--dialects", nargs="+", default=generator.DIALECTS,
+                           choices=generator.DIALECTS)
+    argparser.add_argument("--statements", type=int, nargs="+",
+                           default=[100, 1000])
+    argparser.add_argument("--depth", type=int, default=3)
+    argparser.add_argument("--declarations", type=int, default=8)
+    argparser.add_argument("--trip-count", type=int, default=10)
+    argparser.add_argument("--seed", type=int, default=0)
+    argparser.add_argument("--warmup", type=int, default=1)
+    argparser.add_argument("--repeat", type=int, default=5)
+    argparser.add_argument("--output", type=argparse.FileType("w"),
+                           default=sys.stdout)
+    argparser.add_argument("--baseline", type=argparse.FileType("r"))
+    argparser.add_argument("--threshold", type=float, default=1.2)
+    args = argparser.parse_args()
+
+    current = run(args.dialects, args.statements, args.depth,
+                  args.declarations, args.trip_count, args.seed, args.warmup,
+                  args.repeat)
+    json.dump(current, args.output, indent=2, sort_keys=True)
+    args.output.write("\n")
+    if args.baseline is not None:
+        if compare(json.load(args.baseline), current, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""Compare the tokens per second of the rply lexer and the hand-written scanner.
+
+Run with `python benchmarks/scanner_throughput.py [statements]`. For each
+dialect a program with 20k statements (by default) is tokenized in a fresh
+interpreter by `lexer.lex` and by `scanner.scan`, keeping the best of three
+runs, after checking that both produce the same tokens.
+"""
+from __future__ import print_function
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DIALECTS = ["eenie", "meeny", "eenie_rpython"]
+STATEMENTS = 20000
+
+CHILD = """
+from __future__ import print_function
+
+import sys
+import time
+
+from lexer import lex
+from scanner import scan
+
+
+def positions(tokens):
+    return [(token.name, token.value,
+             token.source_pos and (token.source_pos.idx,
+                                   token.source_pos.lineno,
+                                   token.source_pos.colno))
+            for token in tokens]
+
+
+source = sys.stdin.read()
+assert positions(lex(source)) == positions(scan(source))
+for tokenize in (lex, scan):
+    best = None
+    for _ in range(3):
+        start = time.time()
+        count = sum(1 for _ in tokenize(source))
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(count / best)
+"""
+
+
+def generate(statements):
+    lines = ["# generated", "program throughput has", "decls",
+             "    int total, count", "    int step", "body"]
+    for i in range(statements):
+        lines.append("    total <- total + count - %d" % i)
+        lines.append("    writeln (step + (Total - %d))" % (i * 7))
+    lines.append("end throughput")
+    return "\n".join(lines) + "\n"
+
+
+def throughput(dialect, source):
+    proc = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-c", CHILD],
+        cwd=os.path.join(ROOT, dialect),
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+    )
+    out, _ = proc.communicate(source.encode("ascii"))
+    if proc.returncode:
+        raise RuntimeError("tokenizing failed for %s" % dialect)
+    lex_rate, scan_rate = out.decode("ascii").split()
+    return float(lex_rate), float(scan_rate)
+
+
+def main(statements):
+    source = generate(statements)
+    print("%-15s %14s %14s %8s" % (
+        "dialect", "rply (tok/s)", "scan (tok/s)", "speedup"))
+    for dialect in DIALECTS:
+        lex_rate, scan_rate = throughput(dialect, source)
+        print("%-15s %14.0f %14.0f %7.1fx" % (
+            dialect, lex_rate, scan_rate, scan_rate / lex_rate))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else STATEMENTS)
@@ -0,0 +1,118 @@
+"""Generate load against the meeny program server.
+
+Run with `python3 -m benchmarks.server_load [requests] [concurrency]` from
+the repository root. A server is started on a Unix socket in a temporary
+directory, and 5000 requests (by default) for one small program with varying
+inputs are sent from 32 concurrent connections, each waiting for its
+response before sending the next request. Reports requests per second and
+the median and 99th-percentile latency as seen by the client.
+"""
+from __future__ import print_function
+
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+REQUESTS = 5000
+
+CONCURRENCY = 32
+
+PROGRAM = """
+program service has
+decls
+    int n, step, total, i
+body
+    read(n)
+    read(step)
+    total <- 0
+    i <- 0
+    while n > i do
+        if i % 3 = 0 then
+            total <- total + i * step
+        else
+            total <- total - step
+        endif
+        i <- i + 1
+    endwhile
+    writeln(total)
+end service
+"""
+
+CHILD = """
+import asyncio
+import sys
+import time
+
+import server
+
+program = sys.stdin.read()
+path, requests, concurrency = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+latencies = []
+errors = []
+
+
+async def connection(count, offset):
+    client = await server.Client.connect(path)
+    for i in range(offset, offset + count):
+        start = time.perf_counter()
+        response = await client.run(program, [10 + i % 7, i % 5])
+        latencies.append(time.perf_counter() - start)
+        if response["error"] is not None:
+            errors.append(response["error"])
+    await client.close()
+
+
+async def main():
+    for attempt in range(100):
+        try:
+            client = await server.Client.connect(path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            await asyncio.sleep(0.1)
+        else:
+            await client.close()
+            break
+    share, extra = divmod(requests, concurrency)
+    counts = [share + (i < extra) for i in range(concurrency)]
+    start = time.perf_counter()
+    await asyncio.gather(*[connection(count, sum(counts[:i]))
+                           for i, count in enumerate(counts) if count])
+    return time.perf_counter() - start
+
+
+elapsed = asyncio.run(main())
+latencies.sort()
+print("requests:     %8d (%d errors)" % (len(latencies), len(errors)))
+print("requests/s:   %8.0f" % (len(latencies) / elapsed))
+print("p50 latency:  %8.2f ms" % (latencies[len(latencies) // 2] * 1000))
+print("p99 latency:  %8.2f ms" % (
+    latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)] * 1000))
+"""
+
+
+def main(requests, concurrency):
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "server.sock")
+    meeny = os.path.join(ROOT, "meeny")
+    server = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "server.py", "--unix", path],
+        cwd=meeny)
+    try:
+        client = subprocess.Popen(
+            [sys.executable, "-W", "ignore", "-c", CHILD, path, str(requests),
+             str(concurrency)],
+            cwd=meeny, stdin=subprocess.PIPE)
+        client.communicate(PROGRAM.encode("ascii"))
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else REQUESTS,
+         int(sys.argv[2]) if len(sys.argv) > 2 else CONCURRENCY)
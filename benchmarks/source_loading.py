@@ -0,0 +1,99 @@
+"""Measure how eenie_rpython's `target.read_source` loads large programs.
+
+Run with `python benchmarks/source_loading.py [megabytes ...]`. For each size
+a program of that many megabytes is generated and loaded in a fresh
+interpreter, both from the file itself and through a pipe, and the load time
+and the peak RSS of the child are reported next to those of the old loader
+that appended 4096-byte reads to a growing string.
+"""
+from __future__ import print_function
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SIZES = [1, 10, 100]
+
+CHILD = """
+from __future__ import print_function
+
+import os
+import resource
+import sys
+import time
+
+import target
+
+
+def concatenate(fd):
+    program = b""
+    while True:
+        read = os.read(fd, 4096)
+        if len(read) == 0:
+            break
+        program += read
+    return program
+
+
+load = concatenate if sys.argv[1] == "concatenate" else target.read_source
+fd = 0 if sys.argv[2] == "-" else os.open(sys.argv[2], os.O_RDONLY)
+start = time.time()
+program = load(fd)
+elapsed = time.time() - start
+print(elapsed, len(program),
+      resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+STATEMENT = b"    y <- sam + -3\n"
+
+
+def generate(path, megabytes):
+    statement_count = megabytes * (1 << 20) // len(STATEMENT)
+    with open(path, "wb") as f:
+        f.write(b"program generated has\ndecls\n    int sam, y\nbody\n")
+        block = STATEMENT * 1024
+        for _ in range(statement_count // 1024):
+            f.write(block)
+        f.write(STATEMENT * (statement_count % 1024))
+        f.write(b"end generated\n")
+
+
+def load(loader, path, piped):
+    command = [sys.executable, "-c", CHILD, loader, "-" if piped else path]
+    cwd = os.path.join(ROOT, "eenie_rpython")
+    if piped:
+        cat = subprocess.Popen(["cat", path], stdout=subprocess.PIPE)
+        out = subprocess.check_output(command, cwd=cwd, stdin=cat.stdout)
+        cat.stdout.close()
+        cat.wait()
+    else:
+        out = subprocess.check_output(command, cwd=cwd)
+    elapsed, size, rss = out.decode("ascii").split()
+    assert int(size) == os.path.getsize(path)
+    return float(elapsed), int(rss)
+
+
+def main(sizes):
+    print("%6s %-6s %-12s %10s %14s" % (
+        "MB", "from", "loader", "load (ms)", "peak RSS (MB)"))
+    directory = tempfile.mkdtemp()
+    try:
+        for megabytes in sizes:
+            path = os.path.join(directory, "generated.eenie")
+            generate(path, megabytes)
+            for piped in (False, True):
+                for loader in ("read_source", "concatenate"):
+                    elapsed, rss = load(loader, path, piped)
+                    print("%6d %-6s %-12s %10.1f %14.1f" % (
+                        megabytes, "pipe" if piped else "file", loader,
+                        elapsed * 1000, rss / 1024.0))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
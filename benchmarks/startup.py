@@ -0,0 +1,58 @@
+"""Measure import-to-first-parse latency with a cold and a warm table cache.
+
+Run with `python benchmarks/startup.py`. Each measurement is taken in a fresh
+interpreter whose rply cache directory points at a scratch location, so the
+first run has to build the LALR tables and the following ones load them.
+"""
+from __future__ import print_function
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROGRAMS = [
+    ("eenie", "prog1.eenie"),
+    ("meeny", "prog1.meeny"),
+    ("eenie_rpython", "prog1.eenie"),
+]
+
+CHILD = """
+import time
+start = time.time()
+from lexer import lex
+import parser
+with open(%r) as f:
+    parser.parser.parse(lex(f.read()))
+print(time.time() - start)
+"""
+
+
+def time_startup(dialect, program, cache_home):
+    env = dict(os.environ, XDG_CACHE_HOME=cache_home)
+    out = subprocess.check_output(
+        [sys.executable, "-W", "ignore", "-c", CHILD % program],
+        cwd=os.path.join(ROOT, dialect),
+        env=env,
+    )
+    return float(out.decode("ascii").strip().splitlines()[-1])
+
+
+def main(repeat=5):
+    print("%-15s %10s %10s" % ("dialect", "cold (ms)", "warm (ms)"))
+    for dialect, program in PROGRAMS:
+        cache_home = tempfile.mkdtemp()
+        try:
+            cold = time_startup(dialect, program, cache_home)
+            warm = min(time_startup(dialect, program, cache_home)
+                       for _ in range(repeat))
+        finally:
+            shutil.rmtree(cache_home)
+        print("%-15s %10.1f %10.1f" % (dialect, cold * 1000, warm * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Compare `Token` lists with the array-backed `TokenArray`.
+
+Run with `python benchmarks/token_memory.py [statements]`. For each dialect a
+program with 20k statements (by default) is tokenized in a fresh interpreter
+by `scanner.scan` and by `tokens.lex_compact`. The script reports the bytes
+held per token, as counted by `sys.getsizeof` over every object the
+representation keeps alive, and the best of three lex+parse times.
+"""
+from __future__ import print_function
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DIALECTS = ["eenie", "meeny"]
+STATEMENTS = 20000
+
+CHILD = """
+from __future__ import print_function
+
+import sys
+import time
+
+from parser import parser
+from scanner import scan
+from tokens import lex_compact
+
+
+def token_list_size(tokens):
+    size = sys.getsizeof(tokens)
+    for token in tokens:
+        size += sys.getsizeof(token) + sys.getsizeof(token.__dict__)
+        size += sys.getsizeof(token.value)
+        if token.source_pos is not None:
+            size += sys.getsizeof(token.source_pos)
+            size += sys.getsizeof(token.source_pos.__dict__)
+    return size
+
+
+def token_array_size(tokens):
+    return (sys.getsizeof(tokens) + sys.getsizeof(tokens.__dict__) +
+            sum(sys.getsizeof(buffer)
+                for buffer in (tokens.kinds, tokens.starts, tokens.ends)))
+
+
+def best_time(function):
+    best = None
+    for _ in range(3):
+        start = time.time()
+        function()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+source = sys.stdin.read()
+token_list = list(scan(source))
+token_array = lex_compact(source)
+assert parser.parse(iter(token_list)) == parser.parse(iter(token_array))
+print(len(token_list),
+      token_list_size(token_list), token_array_size(token_array),
+      best_time(lambda: parser.parse(scan(source))),
+      best_time(lambda: parser.parse(iter(lex_compact(source)))))
+"""
+
+
+def generate(statements):
+    lines = ["program tokens has", "decls", "    int total, count", "body"]
+    for i in range(statements):
+        lines.append("    total <- total + count - %d" % i)
+        lines.append("    write (total)")
+    lines.append("end tokens")
+    return "\n".join(lines) + "\n"
+
+
+def measure(dialect, source):
+    proc = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-c", CHILD],
+        cwd=os.path.join(ROOT, dialect),
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+    )
+    out, _ = proc.communicate(source.encode("ascii"))
+    if proc.returncode:
+        raise RuntimeError("tokenizing failed for %s" % dialect)
+    count, list_size, array_size, list_time, array_time = (
+        out.decode("ascii").split())
+    return (int(count), int(list_size), int(array_size),
+            float(list_time), float(array_time))
+
+
+def main(statements):
+    source = generate(statements)
+    print("%-6s %8s %-10s %12s %16s" % (
+        "", "tokens", "stream", "bytes/token", "lex+parse (s)"))
+    for dialect in DIALECTS:
+        count, list_size, array_size, list_time, array_time = measure(
+            dialect, source)
+        print("%-6s %8d %-10s %12.1f %16.3f" % (
+            dialect, count, "Token", list_size / float(count), list_time))
+        print("%-6s %8d %-10s %12.1f %16.3f" % (
+            dialect, count, "TokenArray", array_size / float(count),
+            array_time))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else STATEMENTS)
@@ -0,0 +1,88 @@
+"""Compare the NumPy vector engine with scalar runs of the same program.
+
+Run with `python -m benchmarks.vector_throughput [lanes]` from the repository
+root, under a Python with NumPy installed. A program that reads three numbers
+and loops a data-dependent number of times is run over 100k random input
+rows (by default) at once by `vector`, and row by row for the first 2000
+rows by `embed`. Results are in lanes per second.
+"""
+from __future__ import print_function
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LANES = 100000
+
+SCALAR_LANES = 2000
+
+PROGRAM = """
+program lanes has
+decls
+    int n, x, y, i, total
+body
+    read(n)
+    read(x)
+    read(y)
+    total <- 0
+    i <- n % 16
+    while i > 0 do
+        if x > y then
+            total <- total + x * i
+        else
+            total <- total - (y % 7)
+        endif
+        x <- (x * 3 + 1) % 1009
+        i <- i - 1
+    endwhile
+    writeln(total)
+end lanes
+"""
+
+CHILD = """
+from __future__ import print_function
+
+import sys
+import time
+
+import embed
+import vector
+
+if vector.numpy is None:
+    print("NumPy is not installed; nothing to compare")
+    sys.exit(0)
+numpy = vector.numpy
+
+program = sys.stdin.read()
+lanes, scalar_lanes = int(sys.argv[1]), int(sys.argv[2])
+inputs = numpy.random.RandomState(0).randint(0, 1000, size=(lanes, 3))
+
+executable = embed.compile(program)
+start = time.time()
+expected = [executable.run(row) for row in inputs[:scalar_lanes].tolist()]
+scalar = scalar_lanes / (time.time() - start)
+
+vectorized = vector.compile(program)
+start = time.time()
+outputs = vectorized.run(inputs)
+vectorized_rate = lanes / (time.time() - start)
+
+assert outputs[:scalar_lanes] == expected
+print("scalar:   %12.0f lanes/s" % scalar)
+print("vector:   %12.0f lanes/s  (x%.1f)" % (vectorized_rate,
+                                             vectorized_rate / scalar))
+"""
+
+
+def main(lanes):
+    proc = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-c", CHILD, str(lanes),
+         str(min(lanes, SCALAR_LANES))],
+        cwd=os.path.join(ROOT, "meeny"), stdin=subprocess.PIPE)
+    proc.communicate(PROGRAM.encode("ascii"))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else LANES)
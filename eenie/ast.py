@@ -1,20 +1,18 @@
-import sys
-
 import attr
 
-
-try:
-    raw_input
-except NameError:
-    raw_input = input
+import output
+import reader
+import tracing
 
 
 class ASTNode(object):
+    __slots__ = ()
+
     def eval(self, context):
         raise NotImplementedError(self.__class__)
 
 
-@attr.s
+@attr.s(slots=True)
 class Number(ASTNode):
     value = attr.ib(convert=int)
 
@@ -22,13 +20,13 @@ class Number(ASTNode):
         return self.value
 
 
-@attr.s
+@attr.s(slots=True)
 class Identifier(ASTNode):
     name = attr.ib(validator=attr.validators.instance_of(str))
     value = attr.ib(default=None)
 
 
-@attr.s
+@attr.s(slots=True)
 class IdentifierReference(ASTNode):
     name = attr.ib(validator=attr.validators.instance_of(str))
 
@@ -41,40 +39,87 @@ def is_list_of_identifiers(instance, attribute, value):
         attr.validators.instance_of(Identifier)(instance, attribute, v)
 
 
-@attr.s
+@attr.s(slots=True)
 class Program(ASTNode):
     name = attr.ib()
     decls = attr.ib(validator=is_list_of_identifiers)
     body = attr.ib()
 
     def eval(self, context):
-        for identifier in self.decls:
-            context[identifier.name] = identifier.value
-        for instruction in self.body:
-            print(instruction)
-            instruction.eval(context)
-        for identifier in self.decls:
-            if context[identifier.name] is None:
-                print("Warning: identifier %s not used." % identifier.name)
+        try:
+            for identifier in self.decls:
+                context[identifier.name] = identifier.value
+            if tracing.tracer is None:
+                for instruction in self.body:
+                    instruction.eval(context)
+            else:
+                tracing.tracer.run(self.body, context)
+            for identifier in self.decls:
+                if context[identifier.name] is None:
+                    output.sink.write("Warning: identifier %s not used.\n" %
+                                      identifier.name)
+        finally:
+            output.sink.flush()
+
+
+@attr.s(slots=True)
+class SlotReference(ASTNode):
+    name = attr.ib(validator=attr.validators.instance_of(str))
+    slot = attr.ib(validator=attr.validators.instance_of(int))
+
+    def eval(self, frame):
+        return frame[self.slot]
 
 
-@attr.s
+@attr.s(slots=True)
+class ResolvedProgram(ASTNode):
+    name = attr.ib()
+    decls = attr.ib(validator=is_list_of_identifiers)
+    body = attr.ib()
+    names = attr.ib()
+
+    def eval(self, context):
+        frame = [None] * len(self.names)
+        slots = dict((name, slot) for slot, name in enumerate(self.names))
+        try:
+            for identifier in self.decls:
+                frame[slots[identifier.name]] = identifier.value
+            if tracing.tracer is None:
+                for instruction in self.body:
+                    instruction.eval(frame)
+            else:
+                tracing.tracer.run(self.body, frame)
+            for slot, name in enumerate(self.names):
+                context[name] = frame[slot]
+            for identifier in self.decls:
+                if frame[slots[identifier.name]] is None:
+                    output.sink.write("Warning: identifier %s not used.\n" %
+                                      identifier.name)
+        finally:
+            output.sink.flush()
+
+
+@attr.s(slots=True)
 class BinaryOperation(ASTNode):
     left = attr.ib(validator=attr.validators.instance_of(ASTNode))
     right = attr.ib(validator=attr.validators.instance_of(ASTNode))
 
 
 class Add(BinaryOperation):
+    __slots__ = ()
+
     def eval(self, context):
         return self.left.eval(context) + self.right.eval(context)
 
 
 class Subtract(BinaryOperation):
+    __slots__ = ()
+
     def eval(self, context):
         return self.left.eval(context) - self.right.eval(context)
 
 
-@attr.s
+@attr.s(slots=True)
 class Assignment(ASTNode):
     identifier = attr.ib(validator=attr.validators.instance_of(IdentifierReference))
     value = attr.ib(validator=attr.validators.instance_of(ASTNode))
@@ -84,22 +129,80 @@ class Assignment(ASTNode):
         context[self.identifier.name] = self.value.eval(context)
 
 
-@attr.s
+@attr.s(slots=True)
 class ReadStatement(ASTNode):
     target = attr.ib(validator=attr.validators.instance_of(IdentifierReference))
 
     def eval(self, context):
         assert self.target.name in context
         context[self.target.name] = (
-            Number(raw_input("Value for %s: " % self.target.name))
+            Number(reader.source.read("Value for %s: " % self.target.name))
             .eval(context)
         )
 
 
-@attr.s
+@attr.s(slots=True)
+class SlotAssignment(ASTNode):
+    target = attr.ib(validator=attr.validators.instance_of(SlotReference))
+    value = attr.ib(validator=attr.validators.instance_of(ASTNode))
+
+    def eval(self, frame):
+        frame[self.target.slot] = self.value.eval(frame)
+
+
+@attr.s(slots=True)
+class SlotReadStatement(ASTNode):
+    target = attr.ib(validator=attr.validators.instance_of(SlotReference))
+
+    def eval(self, frame):
+        frame[self.target.slot] = (
+            Number(reader.source.read("Value for %s: " % self.target.name))
+            .eval(frame)
+        )
+
+
+@attr.s(slots=True)
 class WriteStatement(ASTNode):
     value = attr.ib(validator=attr.validators.instance_of(ASTNode))
     newline = attr.ib(default=False)
 
     def eval(self, context):
-        sys.stdout.write(str(self.value.eval(context)) + ("\n" if self.newline else ""))
+        output.sink.write(str(self.value.eval(context)) +
+                          ("\n" if self.newline else ""))
+
+
+# The `(name, validator, attribute)` of each validated field and the names of
+# the fields that may hold nodes, by node class.
+validated_fields = {}
+
+
+def fields_of(cls):
+    fields = validated_fields.get(cls)
+    if fields is None:
+        attributes = attr.fields(cls)
+        fields = validated_fields[cls] = (
+            [(attribute.name, attribute.validator, attribute)
+             for attribute in attributes if attribute.validator is not None],
+            [attribute.name for attribute in attributes
+             if attribute.name not in ("name", "source_pos") and
+             attribute.converter is None])
+    return fields
+
+
+def validate(tree):
+    """Run the field validators of every node in `tree` once.
+
+    Used after building a tree with validators switched off; see
+    `parser.parse`.
+    """
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if type(node) is list:
+            stack.extend(node)
+        elif isinstance(node, ASTNode):
+            validators, children = fields_of(type(node))
+            for name, validator, attribute in validators:
+                validator(node, attribute, getattr(node, name))
+            for name in children:
+                stack.append(getattr(node, name))
@@ -0,0 +1,163 @@
+"""Run many independent eenie programs over a pool of worker processes.
+
+Run with `python batch.py PROGRAM_OR_DIRECTORY ... [options]`; a directory
+stands for the `.eenie` files in it. Each worker process builds the lexer and
+parser once and then runs one program after another, reading the program's
+input from a string and collecting what it writes, including prompts. Results
+stream back in completion order as one JSON object per line, with the
+program's output, exit status (0, 1 on an error, `TIMEOUT_STATUS` when it ran
+out of time) and the time spent parsing, resolving and evaluating it.
+
+`--inputs` is either a file fed to every program or a directory holding the
+input of `name.eenie` in `name.in`. `--timeout` is enforced inside each
+worker with `SIGALRM`, so it interrupts any evaluation but needs a Unix.
+"""
+from __future__ import print_function
+
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import timeit
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+import output
+import parser
+import resolver
+import scanner
+
+EXTENSION = ".eenie"
+
+TIMEOUT_STATUS = 124
+
+
+class Timeout(Exception):
+    pass
+
+
+def find_programs(paths):
+    programs = []
+    for path in paths:
+        if os.path.isdir(path):
+            programs.extend(os.path.join(path, name)
+                            for name in sorted(os.listdir(path))
+                            if name.endswith(EXTENSION))
+        else:
+            programs.append(path)
+    return programs
+
+
+def find_inputs(program, inputs):
+    """The input of `program`: `inputs` itself or a file in it, or ""."""
+    if inputs is None:
+        return ""
+    if os.path.isdir(inputs):
+        name = os.path.splitext(os.path.basename(program))[0] + ".in"
+        inputs = os.path.join(inputs, name)
+        if not os.path.exists(inputs):
+            return ""
+    with open(inputs, "r") as f:
+        return f.read()
+
+
+def describe(error):
+    message = type(error).__name__
+    if str(error):
+        message += ": %s" % error
+    source_pos = getattr(error, "source_pos", None)
+    if source_pos is not None and source_pos.lineno >= 0:
+        message += " at %d:%d" % (source_pos.lineno, source_pos.colno)
+    return message
+
+
+def alarm(signum, frame):
+    raise Timeout()
+
+
+settings = {}
+
+
+def init_worker(timeout):
+    settings["timeout"] = timeout
+    signal.signal(signal.SIGALRM, alarm)
+
+
+def run_program(task):
+    index, path, inputs = task
+    timer = timeit.default_timer
+    timings = {}
+    result = {"index": index, "path": path, "exit_status": 0, "error": None,
+              "timings": timings}
+    collected = StringIO()
+    previous = output.redirect(collected)
+    stdin, stdout = sys.stdin, sys.stdout
+    sys.stdin, sys.stdout = StringIO(inputs), collected
+    try:
+        try:
+            if settings["timeout"]:
+                signal.setitimer(signal.ITIMER_REAL, settings["timeout"])
+            start = timer()
+            with open(path, "r") as f:
+                program = parser.parse(scanner.scan(f.read()))
+            timings["parse"] = timer() - start
+            start = timer()
+            program = resolver.resolve(program)
+            timings["prepare"] = timer() - start
+            start = timer()
+            program.eval({})
+            timings["eval"] = timer() - start
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    except Timeout:
+        result["exit_status"] = TIMEOUT_STATUS
+        result["error"] = "Timed out after %gs" % settings["timeout"]
+    except Exception as e:
+        result["exit_status"] = 1
+        result["error"] = describe(e)
+    finally:
+        sys.stdin, sys.stdout = stdin, stdout
+        try:
+            output.sink.flush()
+        except Timeout:
+            pass
+        output.redirect(previous)
+    result["output"] = collected.getvalue()
+    return result
+
+
+def run_batch(programs, inputs=None, jobs=None, timeout=None):
+    """Run `programs` over `jobs` workers, yielding results as they finish."""
+    tasks = [(index, path, find_inputs(path, inputs))
+             for index, path in enumerate(programs)]
+    pool = multiprocessing.Pool(jobs, init_worker, (timeout,))
+    try:
+        for result in pool.imap_unordered(run_program, tasks):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument("programs", nargs="+")
+    argparser.add_argument("--inputs")
+    argparser.add_argument("--jobs", type=int,
+                           default=multiprocessing.cpu_count())
+    argparser.add_argument("--timeout", type=float)
+    args = argparser.parse_args()
+    failed = 0
+    for result in run_batch(find_programs(args.programs), args.inputs,
+                            args.jobs, args.timeout):
+        failed += result["exit_status"] != 0
+        print(json.dumps(result, sort_keys=True))
+        sys.stdout.flush()
+    sys.exit(1 if failed else 0)
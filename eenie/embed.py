@@ -0,0 +1,52 @@
+"""Compile a eenie program once and run it many times from Python.
+
+`compile` lexes, parses and resolves a source and returns an immutable
+`Executable`. `Executable.run` evaluates it with the given inputs
+handed to its `read` statements in order, without prompting, and returns
+everything it wrote. Each run starts from fresh variables, so running again
+costs nothing but the evaluation itself.
+
+Runs swap the module-level `output.sink` and `reader.source` while they
+last, so executables must be run from one thread at a time.
+"""
+import attr
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+import optimizer
+import output
+import parser
+import reader
+import resolver
+import scanner
+
+
+@attr.s(frozen=True, slots=True)
+class Executable(object):
+    name = attr.ib()
+    program = attr.ib(repr=False)
+
+    def run(self, inputs=(), context=None):
+        """Run with `inputs` and return the output.
+
+        The final values of the variables are stored in `context` if given.
+        """
+        collected = StringIO()
+        previous_sink = output.redirect(collected)
+        previous_source = reader.redirect(reader.Inputs(inputs))
+        try:
+            self.program.eval({} if context is None else context)
+        finally:
+            reader.redirect(previous_source)
+            output.redirect(previous_sink)
+        return collected.getvalue()
+
+
+def compile(source, optimize=False):
+    program = parser.parse(scanner.scan(source))
+    if optimize:
+        program, _ = optimizer.optimize(program)
+    return Executable(program.name, resolver.resolve(program))
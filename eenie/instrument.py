@@ -0,0 +1,36 @@
+"""Temporarily wrap the `eval` method of every AST node class.
+
+Per-node hooks such as tracing are installed only for the duration of a run,
+so the tree walker carries no per-node checks while they are switched off.
+"""
+import contextlib
+
+import ast
+
+
+def node_classes(base=None):
+    if base is None:
+        base = ast.ASTNode
+    for cls in base.__subclasses__():
+        yield cls
+        for subclass in node_classes(cls):
+            yield subclass
+
+
+@contextlib.contextmanager
+def wrapped_eval(wrap):
+    """Replace each node class's own `eval` by `wrap(original)`.
+
+    Programs are left alone: they are the caller of the instrumented run.
+    """
+    originals = {}
+    for cls in set(node_classes()):
+        if "eval" in cls.__dict__ and not issubclass(
+                cls, (ast.Program, ast.ResolvedProgram)):
+            originals[cls] = cls.__dict__["eval"]
+            cls.eval = wrap(originals[cls])
+    try:
+        yield
+    finally:
+        for cls, original in originals.items():
+            cls.eval = original
@@ -1,5 +1,8 @@
+import os
 from collections import OrderedDict
+
 from rply import LexerGenerator, Token
+from rply.errors import LexingError
 
 reserved = ["program", "has", "decls", "int", "body", "end", "read",
             "write", "writeln"]
@@ -24,7 +27,7 @@ for key, value in operators.items():
 
 def id_reserved(token):
     if token.value.lower() in reserved:
-        return Token(token.value.upper(), token.value)
+        return Token(token.value.upper(), token.value, token.source_pos)
     return token
 
 
@@ -45,8 +48,62 @@ def lex(buf):
             token = callback(token)
         yield token
 
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+
+def read_chunks(source, chunk_size):
+    while True:
+        if isinstance(source, int):
+            chunk = os.read(source, chunk_size)
+        else:
+            chunk = source.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def lex_stream(source, chunk_size=DEFAULT_CHUNK_SIZE, tokenize=lex):
+    """Lex a file object or file descriptor `chunk_size` characters at a time.
+
+    Every piece handed to the lexer stops just before a newline, so no token
+    is cut in two, and the pieces after the first start with that newline,
+    where the `^#` comment rule cannot match. Source positions, including
+    that of a `LexingError`, are those in the whole stream. `tokenize` is
+    the function that lexes each piece.
+    """
+    offset = 0
+    lines = 0
+    parts = []
+    for chunk in read_chunks(source, chunk_size):
+        cut = chunk.rfind("\n")
+        if cut < 0:
+            parts.append(chunk)
+            continue
+        parts.append(chunk[:cut])
+        piece = "".join(parts)
+        parts = [chunk[cut:]]
+        for token in rebase(tokenize(piece), offset, lines):
+            yield token
+        offset += len(piece)
+        lines += piece.count("\n")
+    for token in rebase(tokenize("".join(parts)), offset, lines):
+        yield token
+
+
+def rebase(tokens, offset, lines):
+    try:
+        for token in tokens:
+            if token.source_pos is not None:
+                token.source_pos.idx += offset
+                token.source_pos.lineno += lines
+            yield token
+    except LexingError as e:
+        e.source_pos.idx += offset
+        raise
+
 if __name__ == "__main__":
     from pprint import pprint
     from sys import stdin
-    for token in lex(stdin.read()):
+    for token in lex_stream(stdin):
         pprint(token)
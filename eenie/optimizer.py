@@ -0,0 +1,112 @@
+"""Constant folding and algebraic simplification for parsed eenie programs.
+
+`optimize` takes an `ast.Program` straight from the parser and returns an
+equivalent program together with the number of AST nodes it eliminated:
+
+* additions and subtractions of two `Number` operands are folded;
+* `x + 0`, `0 + x` and `x - 0` are reduced to `x` when `x` is known to hold
+  an integer at that point.
+
+Variables hold `None` until they are first assigned, and `None + 0` fails
+where `None` alone would be written out, so a variable only counts as an
+integer once every path to the use has assigned it one.
+"""
+import operator
+
+import ast
+
+
+folders = {
+    ast.Add: operator.add,
+    ast.Subtract: operator.sub,
+}
+
+
+def count_nodes(node):
+    if node is None:
+        return 0
+    elif isinstance(node, list):
+        return sum(count_nodes(child) for child in node)
+    elif isinstance(node, ast.Program):
+        return 1 + count_nodes(node.body)
+    elif isinstance(node, ast.BinaryOperation):
+        return 1 + count_nodes(node.left) + count_nodes(node.right)
+    elif isinstance(node, ast.Assignment):
+        return 1 + count_nodes(node.identifier) + count_nodes(node.value)
+    elif isinstance(node, ast.ReadStatement):
+        return 1 + count_nodes(node.target)
+    elif isinstance(node, ast.WriteStatement):
+        return 1 + count_nodes(node.value)
+    return 1
+
+
+class Optimizer(object):
+    def __init__(self, program):
+        self.program = program
+
+    # Flow analysis. `defined` is the set of variables that hold a value
+    # other than `None` at a given point of the program.
+
+    @staticmethod
+    def holds_value(node, defined):
+        if isinstance(node, ast.IdentifierReference):
+            return node.name in defined
+        return True
+
+    def flow_statement(self, node, defined):
+        if isinstance(node, ast.Assignment):
+            if self.holds_value(node.value, defined):
+                return defined | set([node.identifier.name])
+            return defined - set([node.identifier.name])
+        elif isinstance(node, ast.ReadStatement):
+            return defined | set([node.target.name])
+        return defined
+
+    # Rewriting.
+
+    def statements(self, statements, defined):
+        result = []
+        for statement in statements:
+            result.append(self.statement(statement, defined))
+            defined = self.flow_statement(statement, defined)
+        return result
+
+    def statement(self, node, defined):
+        if isinstance(node, ast.Assignment):
+            return ast.Assignment(node.identifier,
+                                  self.expression(node.value, defined))
+        elif isinstance(node, ast.WriteStatement):
+            return ast.WriteStatement(self.expression(node.value, defined),
+                                      newline=node.newline)
+        return node
+
+    def expression(self, node, defined):
+        if not isinstance(node, ast.BinaryOperation):
+            return node
+        kind = type(node)
+        left = self.expression(node.left, defined)
+        right = self.expression(node.right, defined)
+        if isinstance(left, ast.Number) and isinstance(right, ast.Number):
+            return ast.Number(folders[kind](left.value, right.value))
+        # eenie has only integers, so an operand that holds a value is one,
+        # and adding or subtracting zero leaves it as it is.
+        if (isinstance(right, ast.Number) and right.value == 0 and
+                self.holds_value(left, defined)):
+            return left
+        if (isinstance(left, ast.Number) and left.value == 0 and
+                kind is ast.Add and self.holds_value(right, defined)):
+            return right
+        return kind(left, right)
+
+    def optimize(self):
+        program = self.program
+        defined = set(identifier.name for identifier in program.decls
+                      if identifier.value is not None)
+        return ast.Program(program.name, program.decls,
+                           self.statements(program.body, defined))
+
+
+def optimize(program):
+    """Return the optimized program and the number of nodes eliminated."""
+    optimized = Optimizer(program).optimize()
+    return optimized, count_nodes(program) - count_nodes(optimized)
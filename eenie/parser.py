@@ -1,10 +1,12 @@
+import attr
 from rply import ParserGenerator
 
-from lexer import token_names, lex
+from lexer import token_names
 import ast
 
 pg = ParserGenerator(
-    token_names
+    token_names,
+    cache_id="eenie"
 )
 
 
@@ -44,12 +46,14 @@ def declist_int(p):
 
 @pg.production('declist : declist INT varlst')
 def declist_list(p):
-    return p[0] + p[2]
+    p[0].extend(p[2])
+    return p[0]
 
 
 @pg.production('varlst : varlst COMMA ID')
 def varlst_varlst(p):
-    return p[0] + [ast.Identifier(p[2].getstr())]
+    p[0].append(ast.Identifier(p[2].getstr()))
+    return p[0]
 
 
 @pg.production('varlst : ID')
@@ -65,7 +69,8 @@ def stmtlist_stmt(p):
 
 @pg.production('stmtlst : stmtlst stmt')
 def stmtlist_stmtlist(p):
-    return p[0] + [p[1]]
+    p[0].append(p[1])
+    return p[0]
 
 
 @pg.production('stmt : WRITE PAREN_L exp PAREN_R')
@@ -134,10 +139,52 @@ def factor_parens(p):
 
 parser = pg.build()
 
+
+def parse(tokens, validate=True):
+    """Parse `tokens`, running the field validators of each new node unless
+    `validate` is false.
+
+    Skipping them uses attrs' process-wide switch while the parse runs, so a
+    parse with `validate` false is not thread-safe: attrs objects that other
+    threads build meanwhile skip their validators too. `ast.validate` checks
+    such a tree afterwards.
+    """
+    if validate:
+        return parser.parse(tokens)
+    run_validators = attr.get_run_validators()
+    attr.set_run_validators(False)
+    try:
+        return parser.parse(tokens)
+    finally:
+        attr.set_run_validators(run_validators)
+
+
 if __name__ == "__main__":
+    import argparse
+    import sys
     from pprint import pprint
-    from sys import argv
-    with open(argv[1], "r") as f:
-        p = parser.parse(lex(f.read()))
-    pprint(p.__dict__)
-    pprint(p.eval({}))
+
+    import optimizer
+    import resolver
+    import scanner
+    import tracing
+
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument("filename")
+    argparser.add_argument("--optimize", action="store_true")
+    argparser.add_argument("--no-validate", dest="validate",
+                           action="store_false")
+    argparser.add_argument("--trace", choices=sorted(tracing.levels),
+                           default="off")
+    argparser.add_argument("--trace-file", type=argparse.FileType("w"),
+                           default=sys.stderr)
+    argparser.add_argument("--trace-every", type=int, default=1)
+    args = argparser.parse_args()
+    with open(args.filename, "r") as f:
+        p = parse(scanner.scan_stream(f), validate=args.validate)
+    if args.optimize:
+        p, eliminated = optimizer.optimize(p)
+        sys.stderr.write("Optimizer eliminated %d nodes\n" % eliminated)
+    if tracing.enable(args.trace, args.trace_file, args.trace_every):
+        pprint(attr.asdict(p, recurse=False), stream=args.trace_file)
+    pprint(resolver.resolve(p).eval({}))
@@ -0,0 +1,58 @@
+"""Resolve identifiers to frame slots ahead of evaluation.
+
+`resolve` numbers every declared identifier and rewrites the body of a parsed
+`ast.Program` so that references, assignments and reads index a list frame
+instead of looking names up in a dict. The result is an `ast.ResolvedProgram`,
+evaluated like the original program.
+"""
+import ast
+
+
+class ResolveError(Exception):
+    pass
+
+
+class Resolver(object):
+    def __init__(self, decls):
+        self.names = []
+        self.slots = {}
+        for identifier in decls:
+            if identifier.name not in self.slots:
+                self.slots[identifier.name] = len(self.names)
+                self.names.append(identifier.name)
+
+    def reference(self, node):
+        if node.name not in self.slots:
+            raise ResolveError("Undeclared identifier %s" % node.name)
+        return ast.SlotReference(node.name, self.slots[node.name])
+
+    def statements(self, statements):
+        return [self.statement(statement) for statement in statements]
+
+    def statement(self, node):
+        if isinstance(node, ast.Assignment):
+            return ast.SlotAssignment(self.reference(node.identifier),
+                                      self.expression(node.value))
+        elif isinstance(node, ast.ReadStatement):
+            return ast.SlotReadStatement(self.reference(node.target))
+        elif isinstance(node, ast.WriteStatement):
+            return ast.WriteStatement(self.expression(node.value),
+                                      newline=node.newline)
+        raise NotImplementedError(node.__class__)
+
+    def expression(self, node):
+        if isinstance(node, ast.Number):
+            return node
+        elif isinstance(node, ast.IdentifierReference):
+            return self.reference(node)
+        elif isinstance(node, ast.BinaryOperation):
+            return type(node)(self.expression(node.left),
+                              self.expression(node.right))
+        raise NotImplementedError(node.__class__)
+
+
+def resolve(program):
+    resolver = Resolver(program.decls)
+    return ast.ResolvedProgram(program.name, program.decls,
+                               resolver.statements(program.body),
+                               resolver.names)
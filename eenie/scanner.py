@@ -0,0 +1,76 @@
+"""A hand-written scanner producing the same tokens as `lexer.lex`.
+
+rply's generated lexer tries every rule's regular expression in turn at each
+position and then looks identifiers up in the `reserved` list. `scan` instead
+dispatches on the current character and finds keywords in a dict, while
+keeping the token names, values and source positions of the rply lexer, which
+stays in `lexer` as the reference implementation.
+"""
+from rply.errors import LexingError
+from rply.token import SourcePosition, Token
+
+import lexer
+
+
+WHITESPACE = " \t\n\r\x0b\x0c"
+DIGITS = "0123456789"
+LETTERS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+ALPHANUMERIC = LETTERS + DIGITS
+
+keywords = dict((name, name.upper()) for name in lexer.reserved)
+
+# Operators by their first character, in the order rply tries them.
+operators = {}
+for name, pattern in lexer.operators.items():
+    literal = pattern.replace("\\", "")
+    operators.setdefault(literal[0], []).append((literal, name))
+
+
+def spans(buf):
+    """Yield `(name, start, end, lineno, colno)` for every token in `buf`."""
+    position = 0
+    end = len(buf)
+    lineno = 1
+    line_start = 0
+    if buf.startswith("#"):
+        position = buf.find("\n")
+        if position < 0:
+            position = end
+    while True:
+        while position < end and buf[position] in WHITESPACE:
+            if buf[position] == "\n":
+                lineno += 1
+                line_start = position + 1
+            position += 1
+        if position >= end:
+            return
+        start = position
+        char = buf[position]
+        if char in DIGITS:
+            position += 1
+            while position < end and buf[position] in DIGITS:
+                position += 1
+            name = "NUM"
+        elif char in LETTERS:
+            position += 1
+            while position < end and buf[position] in ALPHANUMERIC:
+                position += 1
+            name = keywords.get(buf[start:position].lower(), "ID")
+        else:
+            for literal, name in operators.get(char, ()):
+                if buf.startswith(literal, position):
+                    position += len(literal)
+                    break
+            else:
+                raise LexingError(None, SourcePosition(position, -1, -1))
+        yield name, start, position, lineno, start - line_start + 1
+
+
+def scan(buf):
+    for name, start, end, lineno, colno in spans(buf):
+        yield Token(name, buf[start:end], SourcePosition(start, lineno, colno))
+
+
+def scan_stream(source, chunk_size=lexer.DEFAULT_CHUNK_SIZE):
+    """`scan` a file object or file descriptor in chunks; see `lex_stream`."""
+    return lexer.lex_stream(source, chunk_size, scan)
@@ -0,0 +1,110 @@
+"""A compact, array-backed alternative to a list of rply tokens.
+
+`lex_compact` records each token of a source as a small integer kind and its
+start and end offsets, in three `array` buffers that take nine bytes per token
+instead of a `Token`, its value and its `SourcePosition`. Iterating over a
+`TokenArray` yields `ArrayToken` adapters, which the parser consumes like
+tokens; values are sliced from the source and source positions computed only
+when asked for, so the adapters the parser drops cost nothing further.
+"""
+from array import array
+from bisect import bisect_left
+
+from rply.token import SourcePosition
+
+import lexer
+import scanner
+
+
+names = lexer.token_names
+kinds = dict((name, kind) for kind, name in enumerate(names))
+
+
+class TokenArray(object):
+    def __init__(self, source):
+        self.source = source
+        self.kinds = array("B")
+        self.starts = array("i")
+        self.ends = array("i")
+        self.newlines = None
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, index):
+        if not 0 <= index < len(self.kinds):
+            raise IndexError(index)
+        return ArrayToken(self, index)
+
+    def __iter__(self):
+        for index in range(len(self.kinds)):
+            yield ArrayToken(self, index)
+
+    def append(self, name, start, end):
+        self.kinds.append(kinds[name])
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def name(self, index):
+        return names[self.kinds[index]]
+
+    def value(self, index):
+        return self.source[self.starts[index]:self.ends[index]]
+
+    def source_pos(self, index):
+        """The position rply would give the token."""
+        if self.newlines is None:
+            self.newlines = array("i")
+            newline = self.source.find("\n")
+            while newline >= 0:
+                self.newlines.append(newline)
+                newline = self.source.find("\n", newline + 1)
+        start = self.starts[index]
+        line = bisect_left(self.newlines, start)
+        line_start = self.newlines[line - 1] + 1 if line else 0
+        return SourcePosition(start, line + 1, start - line_start + 1)
+
+
+class ArrayToken(object):
+    """The `Token` interface over one entry of a `TokenArray`."""
+    __slots__ = ("tokens", "index")
+
+    def __init__(self, tokens, index):
+        self.tokens = tokens
+        self.index = index
+
+    def __repr__(self):
+        return "Token(%r, %r)" % (self.name, self.value)
+
+    @property
+    def name(self):
+        return self.tokens.name(self.index)
+
+    @property
+    def value(self):
+        return self.tokens.value(self.index)
+
+    @property
+    def source_pos(self):
+        return self.tokens.source_pos(self.index)
+
+    def gettokentype(self):
+        return names[self.tokens.kinds[self.index]]
+
+    def getstr(self):
+        return self.tokens.value(self.index)
+
+    def getsourcepos(self):
+        return self.source_pos
+
+
+def lex_compact(buf):
+    tokens = TokenArray(buf)
+    append_kind = tokens.kinds.append
+    append_start = tokens.starts.append
+    append_end = tokens.ends.append
+    for name, start, end, _, _ in scanner.spans(buf):
+        append_kind(kinds[name])
+        append_start(start)
+        append_end(end)
+    return tokens
@@ -0,0 +1,17 @@
+"""Overflow-checked machine integer arithmetic.
+
+Translated, `ovfcheck` is RPython's own: wrapped directly around an integer
+operation, it raises `OverflowError` instead of letting the result wrap.
+Untranslated, Python promotes the result to a long instead, and the stand-in
+below raises the same error for anything outside a machine word.
+"""
+import sys
+
+try:
+    from rpython.rlib.rarithmetic import ovfcheck
+except ImportError:
+    def ovfcheck(value):
+        # type: (int) -> int
+        if not -sys.maxsize - 1 <= value <= sys.maxsize:
+            raise OverflowError("integer overflow")
+        return value
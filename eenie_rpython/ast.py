@@ -2,14 +2,46 @@ from __future__ import division
 
 from rply.token import BaseBox, Token  # noqa
 from typing import Optional, Iterator  # noqa
-import os
+
+from arithmetic import ovfcheck
+import jit
+import output
+import reader
+
+
+class ArithmeticFailure(Exception):
+    description = ""
+
+    def __init__(self, operator):
+        # type: (str) -> None
+        self.operator = operator
+
+    def __str__(self):
+        # type: () -> str
+        return "%s in %s" % (self.description, self.operator)
+
+
+class IntegerOverflow(ArithmeticFailure):
+    description = "Integer overflow"
+
+
+class DivisionByZero(ArithmeticFailure):
+    description = "Division by zero"
 
 
 class ASTNode(BaseBox):
-    def eval(self, context):
-        # type: (Dict[str, ASTNode]) -> Optional[ASTNode]
+    def eval(self, frame):
+        # type: (List[ASTNode]) -> Optional[ASTNode]
         raise NotImplementedError(self.__class__)
 
+    def eval_int(self, frame):
+        # type: (List[ASTNode]) -> int
+        """Evaluate to a raw int, without boxing intermediate results."""
+        value = self.eval(frame)
+        if value is None or not isinstance(value, Number):
+            raise AssertionError("Expected numeric value: %s" % value)
+        return value.getint()
+
 
 class IdentifierList(BaseBox):
     def __init__(self, identifiers):
@@ -40,6 +72,8 @@ class IdentifierList(BaseBox):
 
 
 class Block(ASTNode):
+    _immutable_fields_ = ["statements"]
+
     def __init__(self, statements):
         # type: (List[ASTNode]) -> None
         self.statements = statements
@@ -60,13 +94,16 @@ class Block(ASTNode):
         self.statements.append(statement)
         return self
 
-    def eval(self, context):
-        # type: (Dict[str, ASTNode]) -> None
+    @jit.unroll_safe
+    def eval(self, frame):
+        # type: (List[ASTNode]) -> None
         for statement in self.statements:
-            statement.eval(context)
+            jit.promote(statement).eval(frame)
 
 
 class Number(ASTNode):
+    _immutable_fields_ = ["intvalue"]
+
     def __init__(self, value):
         # type: (int) -> None
         self.intvalue = value
@@ -75,10 +112,27 @@ class Number(ASTNode):
         # type: () -> int
         return self.intvalue
 
-    def eval(self, context):
-        # type: (Dict[str, ASTNode]) -> Number
+    def eval(self, frame):
+        # type: (List[ASTNode]) -> Number
         return self
 
+    def eval_int(self, frame):
+        # type: (List[ASTNode]) -> int
+        return self.intvalue
+
+
+# Boxes for the values most programs produce are allocated once, up front.
+SMALL_INT_MIN = -128
+SMALL_INT_MAX = 1023
+small_ints = [Number(i) for i in range(SMALL_INT_MIN, SMALL_INT_MAX + 1)]
+
+
+def box(value):
+    # type: (int) -> Number
+    if SMALL_INT_MIN <= value <= SMALL_INT_MAX:
+        return small_ints[value - SMALL_INT_MIN]
+    return Number(value)
+
 
 class Identifier(ASTNode):
     def __init__(self, name):
@@ -91,65 +145,127 @@ class IdentifierReference(ASTNode):
         # type: (str) -> None
         self.name = name
 
-    def eval(self, context):
-        # type: (Dict[str, ASTNode]) -> ASTNode
-        return context[self.name]
+    def eval(self, frame):
+        # type: (List[ASTNode]) -> ASTNode
+        raise AssertionError("Unresolved identifier %s" % self.name)
+
+
+class SlotReference(ASTNode):
+    _immutable_fields_ = ["name", "slot"]
+
+    def __init__(self, name, slot):
+        # type: (str, int) -> None
+        self.name = name
+        self.slot = slot
+
+    def eval(self, frame):
+        # type: (List[ASTNode]) -> ASTNode
+        return frame[self.slot]
+
+    def eval_int(self, frame):
+        # type: (List[ASTNode]) -> int
+        value = frame[self.slot]
+        assert isinstance(value, Number)
+        return value.getint()
 
 
 class Program(ASTNode):
-    def __init__(self, name, decls, body):
-        # type: (str, IdentifierList, Block) -> None
+    def __init__(self, name, decls, body, frame_size=-1):
+        # type: (str, IdentifierList, Block, int) -> None
         self.name = name
         self.decls = decls
         self.body = body
+        self.frame_size = frame_size
+
+    def new_frame(self):
+        # type: () -> List[ASTNode]
+        if self.frame_size < 0:
+            raise AssertionError("Program %s is not resolved" % self.name)
+        return [None] * self.frame_size  # type: ignore
 
-    def eval(self, context):
-        # type: (Dict[str, ASTNode]) -> None
-        for identifier in self.decls:
-            context[identifier.name] = Number(0)
-        self.body.eval(context)
+    def eval(self, frame):
+        # type: (List[ASTNode]) -> None
+        for slot in range(self.frame_size):
+            frame[slot] = box(0)
+        try:
+            self.body.eval(frame)
+        finally:
+            output.stdout.flush()
 
 
 class BinaryOperation(ASTNode):
+    _immutable_fields_ = ["left", "right"]
+
     def __init__(self, left, right):
         # type: (ASTNode, ASTNode) -> None
         self.left = left
         self.right = right
 
-    def value_of(self, node, context):
-        # type: (ASTNode, Dict[str, ASTNode]) -> Number
-        v = node.eval(context)
-        if v is None or not isinstance(v, Number):
-            raise AssertionError("Expected numeric value: %s" % v)
-        return v
+    def eval(self, frame):
+        # type: (List[ASTNode]) -> Number
+        return box(self.eval_int(frame))
 
 
 class Add(BinaryOperation):
-    def eval(self, context):
-        # type: (Dict[str, ASTNode]) -> Number
-        return Number(self.value_of(self.left, context).getint() +
-                      self.value_of(self.right, context).getint())
+    def eval_int(self, frame):
+        # type: (List[ASTNode]) -> int
+        left = self.left.eval_int(frame)
+        right = self.right.eval_int(frame)
+        try:
+            return ovfcheck(left + right)
+        except OverflowError:
+            raise IntegerOverflow("+")
 
 
 class Subtract(BinaryOperation):
-    def eval(self, context):
-        # type: (Dict[str, ASTNode]) -> Number
-        return Number(self.value_of(self.left, context).getint() -
-                      self.value_of(self.right, context).getint())
+    def eval_int(self, frame):
+        # type: (List[ASTNode]) -> int
+        left = self.left.eval_int(frame)
+        right = self.right.eval_int(frame)
+        try:
+            return ovfcheck(left - right)
+        except OverflowError:
+            raise IntegerOverflow("-")
 
 
 class Multiply(BinaryOperation):
-    def eval(self, context):
-        # type: (Dict[str, ASTNode]) -> Number
-        return Number(self.value_of(self.left, context).getint() *
-                      self.value_of(self.right, context).getint())
+    def eval_int(self, frame):
+        # type: (List[ASTNode]) -> int
+        left = self.left.eval_int(frame)
+        right = self.right.eval_int(frame)
+        try:
+            return ovfcheck(left * right)
+        except OverflowError:
+            raise IntegerOverflow("*")
 
 
 class Divide(BinaryOperation):
-    def eval(self, context):
-        # type: (Dict[str, ASTNode]) -> Number
-        return Number(self.value_of(self.left, context).getint() //
-                      self.value_of(self.right, context).getint())
+    def eval_int(self, frame):
+        # type: (List[ASTNode]) -> int
+        left = self.left.eval_int(frame)
+        right = self.right.eval_int(frame)
+        if right == 0:
+            raise DivisionByZero("//")
+        try:
+            return ovfcheck(left // right)
+        except OverflowError:
+            raise IntegerOverflow("//")
+
+
+class GreaterThan(BinaryOperation):
+    def eval_int(self, frame):
+        # type: (List[ASTNode]) -> int
+        if self.left.eval_int(frame) > self.right.eval_int(frame):
+            return 1
+        return 0
+
+
+class EqualTo(BinaryOperation):
+    def eval_int(self, frame):
+        # type: (List[ASTNode]) -> int
+        if self.left.eval_int(frame) == self.right.eval_int(frame):
+            return 1
+        return 0
 
 
 class Assignment(ASTNode):
@@ -158,13 +274,22 @@ class Assignment(ASTNode):
         self.identifier = identifier
         self.value = value
 
-    def eval(self, context):
-        # type: (Dict[str, ASTNode]) -> None
-        assert self.identifier.name in context
-        value = self.value.eval(context)
-        if value is None:
-            raise AssertionError("Attempting to assign a null value")
-        context[self.identifier.name] = value
+    def eval(self, frame):
+        # type: (List[ASTNode]) -> None
+        raise AssertionError("Unresolved identifier %s" % self.identifier.name)
+
+
+class SlotAssignment(ASTNode):
+    _immutable_fields_ = ["target", "value"]
+
+    def __init__(self, target, value):
+        # type: (SlotReference, ASTNode) -> None
+        self.target = target
+        self.value = value
+
+    def eval(self, frame):
+        # type: (List[ASTNode]) -> None
+        frame[self.target.slot] = box(self.value.eval_int(frame))
 
 
 class ReadStatement(ASTNode):
@@ -172,29 +297,27 @@ class ReadStatement(ASTNode):
         # type: (IdentifierReference) -> None
         self.target = target
 
-    @staticmethod
-    def raw_input(prompt):
-        # type: (bytes) -> bytes
-        os.write(1, prompt)
-        res = b''
-        while True:
-            buf = os.read(0, 16)
-            if not buf:
-                return res
-            res += buf
-            if res[-1] == '\n':
-                return res[:-1]
-
-    def eval(self, context):
-        # type: (Dict[str, ASTNode]) -> None
-        assert self.target.name in context
-        context[self.target.name] = (
-            Number(int(self.raw_input(b"Value for %s: " % self.target.name)))
-            .eval(context)
-        )
+    def eval(self, frame):
+        # type: (List[ASTNode]) -> None
+        raise AssertionError("Unresolved identifier %s" % self.target.name)
+
+
+class SlotReadStatement(ASTNode):
+    _immutable_fields_ = ["target"]
+
+    def __init__(self, target):
+        # type: (SlotReference) -> None
+        self.target = target
+
+    def eval(self, frame):
+        # type: (List[ASTNode]) -> None
+        frame[self.target.slot] = box(reader.stdin.readint(
+            b"Value for %s: " % self.target.name))
 
 
 class WriteStatement(ASTNode):
+    _immutable_fields_ = ["value", "newline"]
+
     def __init__(self, value, newline=False):
         # type: (IdentifierReference, bool) -> None
         self.value = value
@@ -209,7 +332,43 @@ class WriteStatement(ASTNode):
         except:
             return str(i).encode("ascii")
 
-    def eval(self, context):
-        # type: (Dict[str, ASTNode]) -> None
-        os.write(1, self.int_to_bytes(self.value.eval(context).getint()) +
-                 (b"\n" if self.newline else b""))
+    def eval(self, frame):
+        # type: (List[ASTNode]) -> None
+        output.stdout.write(
+            self.int_to_bytes(self.value.eval_int(frame)) +
+            (b"\n" if self.newline else b""))
+
+
+class WhileStatement(ASTNode):
+    _immutable_fields_ = ["condition", "body"]
+
+    def __init__(self, condition, body):
+        # type: (ASTNode, Block) -> None
+        self.condition = condition
+        self.body = body
+
+    def eval(self, frame):
+        # type: (List[ASTNode]) -> None
+        node = self
+        while True:
+            jit.driver.jit_merge_point(node=node, frame=frame)
+            if node.condition.eval_int(frame) == 0:
+                break
+            node.body.eval(frame)
+
+
+class IfStatement(ASTNode):
+    _immutable_fields_ = ["condition", "body", "else_body"]
+
+    def __init__(self, condition, body, else_body):
+        # type: (ASTNode, Block, Optional[Block]) -> None
+        self.condition = condition
+        self.body = body
+        self.else_body = else_body
+
+    def eval(self, frame):
+        # type: (List[ASTNode]) -> None
+        if self.condition.eval_int(frame) != 0:
+            self.body.eval(frame)
+        elif self.else_body is not None:
+            self.else_body.eval(frame)
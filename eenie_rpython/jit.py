@@ -0,0 +1,34 @@
+"""Hints for RPython's meta-tracing JIT.
+
+`driver` marks the top of every `while` loop, with the loop node as the green
+(constant per trace) variable and the frame as the red one; translating with
+`--opt=jit` compiles traces of hot loops from it. Where RPython cannot be
+imported, the stand-ins below do nothing and the interpreter runs unchanged.
+"""
+try:
+    from rpython.rlib.jit import JitDriver, promote, unroll_safe
+except ImportError:
+    class JitDriver(object):
+        def __init__(self, **kwargs):
+            pass
+
+        def jit_merge_point(self, **kwargs):
+            pass
+
+        def can_enter_jit(self, **kwargs):
+            pass
+
+    def promote(value):
+        return value
+
+    def unroll_safe(function):
+        return function
+
+
+def get_location(node):
+    # type: (ast.WhileStatement) -> str
+    return "while loop"
+
+
+driver = JitDriver(greens=["node"], reds=["frame"],
+                   get_printable_location=get_location)
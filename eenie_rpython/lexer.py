@@ -1,9 +1,12 @@
+import os
 from collections import OrderedDict
+
 from rply import LexerGenerator, Token
 from typing import Callable, Iterator  # noqa
 
 reserved = ["program", "has", "decls", "int", "body", "end", "read",
-            "write", "writeln"]
+            "write", "writeln", "if", "then", "else", "endif", "while",
+            "do", "endwhile"]
 
 operators = OrderedDict([
     ("COMMA", ","),
@@ -14,6 +17,8 @@ operators = OrderedDict([
     ("DIVIDE", r"/"),
     ("PLUS", r"\+"),
     ("MINUS", r"-"),
+    ("ANGLE_R", r">"),
+    ("EQUAL", r"="),
 ])
 
 lg = LexerGenerator()
@@ -27,7 +32,7 @@ for key, value in operators.items():
 
 def id_reserved(token):
     if token.value.lower() in reserved:
-        return Token(token.value.upper(), token.value)
+        return Token(token.value.upper(), token.value, token.source_pos)
     return token
 
 
@@ -48,3 +53,46 @@ def lex(buf):
         for callback in callbacks.get(token.name, []):
             token = callback(token)
         yield token
+
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+
+def lex_stream(fd, chunk_size=DEFAULT_CHUNK_SIZE):
+    # type: (int, int) -> Iterator[Token]
+    """Lex the file descriptor `fd`, reading `chunk_size` bytes at a time.
+
+    Every piece handed to the lexer stops just before a newline, so no token
+    is cut in two, and the pieces after the first start with that newline,
+    where the `^#` comment rule cannot match. Token positions are those in
+    the whole stream.
+    """
+    offset = 0
+    lines = 0
+    parts = []  # type: List[bytes]
+    while True:
+        chunk = os.read(fd, chunk_size)
+        if len(chunk) == 0:
+            break
+        cut = chunk.rfind(b"\n")
+        if cut < 0:
+            parts.append(chunk)
+            continue
+        parts.append(chunk[:cut])
+        piece = b"".join(parts)
+        parts = [chunk[cut:]]
+        for token in lex(piece):
+            rebase(token, offset, lines)
+            yield token
+        offset += len(piece)
+        lines += piece.count(b"\n")
+    for token in lex(b"".join(parts)):
+        rebase(token, offset, lines)
+        yield token
+
+
+def rebase(token, offset, lines):
+    # type: (Token, int, int) -> None
+    if token.source_pos is not None:
+        token.source_pos.idx += offset
+        token.source_pos.lineno += lines
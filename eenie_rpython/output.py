@@ -0,0 +1,63 @@
+"""Buffered destination for program output.
+
+`WriteStatement` appends to the prebuilt `stdout` sink instead of issuing a
+`write` syscall per statement. The sink flushes once `limit` bytes are
+pending, before a `read` statement prompts, and when a program finishes.
+It can be pointed at another file descriptor with `redirect`, or switched
+to keep everything in memory with `collect`.
+"""
+import os
+
+from typing import List  # noqa
+
+
+DEFAULT_LIMIT = 8192
+
+
+class OutputSink(object):
+    def __init__(self, fd=1, limit=DEFAULT_LIMIT):
+        # type: (int, int) -> None
+        self.fd = fd
+        self.limit = limit
+        self.pending = []  # type: List[bytes]
+        self.size = 0
+        self.collected = []  # type: List[bytes]
+
+    def write(self, data):
+        # type: (bytes) -> None
+        self.pending.append(data)
+        self.size += len(data)
+        if self.size >= self.limit:
+            self.flush()
+
+    def flush(self):
+        # type: () -> None
+        if self.size == 0:
+            return
+        data = b"".join(self.pending)
+        self.pending = []
+        self.size = 0
+        if self.fd < 0:
+            self.collected.append(data)
+            return
+        while len(data) > 0:
+            written = os.write(self.fd, data)
+            data = data[written:]
+
+    def redirect(self, fd):
+        # type: (int) -> None
+        self.flush()
+        self.fd = fd
+
+    def collect(self):
+        # type: () -> None
+        """Keep output in memory from now on; see `getvalue`."""
+        self.redirect(-1)
+
+    def getvalue(self):
+        # type: () -> bytes
+        self.flush()
+        return b"".join(self.collected)
+
+
+stdout = OutputSink()
@@ -8,9 +8,11 @@ from typing import Union  # noqa
 pg = ParserGenerator(
     token_names,
     precedence=[
-        ("left", ["ADD", "MINUS"]),
+        ("left", ["ANGLE_R", "EQUAL"]),
+        ("left", ["PLUS", "MINUS"]),
         ("left", ["MULTIPLY", "DIVIDE"]),
-    ]
+    ],
+    cache_id="eenie_rpython"
 )
 
 
@@ -109,11 +111,32 @@ def assign(p):
     return ast.Assignment(ast.IdentifierReference(p[0].getstr()), p[2])
 
 
+# Control statements
+@pg.production('stmt : WHILE exp DO stmtlst ENDWHILE')
+def loop(p):
+    # type: (List) -> ast.WhileStatement
+    return ast.WhileStatement(p[1], p[3])
+
+
+@pg.production('stmt : IF exp THEN stmtlst ELSE stmtlst ENDIF')
+def stmt_elif(p):
+    # type: (List) -> ast.IfStatement
+    return ast.IfStatement(p[1], p[3], p[5])
+
+
+@pg.production('stmt : IF exp THEN stmtlst ENDIF')
+def stmt_if(p):
+    # type: (List) -> ast.IfStatement
+    return ast.IfStatement(p[1], p[3], None)
+
+
 # Expression evaluation
 @pg.production('exp : exp PLUS exp')
 @pg.production('exp : exp MINUS exp')
 @pg.production('exp : exp MULTIPLY exp')
 @pg.production('exp : exp DIVIDE exp')
+@pg.production('exp : exp ANGLE_R exp')
+@pg.production('exp : exp EQUAL exp')
 def exp_binary_term(p):
     # type: (List[Union[Token, ast.ASTNode]]) -> ast.BinaryOperation
     token_type, left, right = p[1].gettokentype(), p[0], p[2]
@@ -122,6 +145,8 @@ def exp_binary_term(p):
         "MINUS": ast.Subtract,
         "MULTIPLY": ast.Multiply,
         "DIVIDE": ast.Divide,
+        "ANGLE_R": ast.GreaterThan,
+        "EQUAL": ast.EqualTo,
     }
     return mapping[token_type](left, right)
 
@@ -155,7 +180,11 @@ parser = pg.build()
 if __name__ == "__main__":
     from pprint import pprint
     from sys import argv
+
+    import resolver
+
     with open(argv[1], "r") as f:
         p = parser.parse(lex(f.read()))
     pprint(p.__dict__)
-    pprint(p.eval({}))
+    resolved = resolver.resolve(p)
+    pprint(resolved.eval(resolved.new_frame()))
@@ -0,0 +1,131 @@
+"""Buffered source for the values consumed by `read` statements.
+
+`SlotReadStatement` takes its values from the prebuilt `stdin` reader. It
+fetches input in blocks of `size` bytes and keeps whatever follows the current
+line for the next `read` statement, so piped input costs one `read` syscall
+per block rather than one per 16 bytes, and integers are parsed directly out
+of the buffer. `feed` points the reader at a file of inputs, one per line,
+and turns prompts off for batch runs.
+"""
+import os
+
+from arithmetic import ovfcheck
+import output
+
+
+DEFAULT_SIZE = 65536
+
+
+class InputError(Exception):
+    def __init__(self, message):
+        # type: (str) -> None
+        self.message = message
+
+    def __str__(self):
+        # type: () -> str
+        return self.message
+
+
+class InputReader(object):
+    def __init__(self, fd=0, size=DEFAULT_SIZE, prompts=True):
+        # type: (int, int, bool) -> None
+        self.fd = fd
+        self.size = size
+        self.prompts = prompts
+        self.buffer = b""
+        self.position = 0
+        self.eof = False
+
+    def feed(self, fd):
+        # type: (int) -> None
+        """Read from `fd` from now on, without prompting."""
+        self.fd = fd
+        self.prompts = False
+        self.buffer = b""
+        self.position = 0
+        self.eof = False
+
+    def fill(self):
+        # type: () -> bool
+        """Append another block to the unread input; False at end of input."""
+        if self.eof:
+            return False
+        data = os.read(self.fd, self.size)
+        if len(data) == 0:
+            self.eof = True
+            return False
+        start = self.position
+        assert start >= 0
+        self.buffer = self.buffer[start:] + data
+        self.position = 0
+        return True
+
+    def line_end(self):
+        # type: () -> int
+        """Index of the end of the current line, or -1 at end of input."""
+        while True:
+            end = self.buffer.find(b"\n", self.position)
+            if end >= 0:
+                return end
+            if not self.fill():
+                if self.position < len(self.buffer):
+                    return len(self.buffer)
+                return -1
+
+    def readline(self, prompt):
+        # type: (bytes) -> bytes
+        self.prompt(prompt)
+        end = self.line_end()
+        if end < 0:
+            raise InputError("Unexpected end of input")
+        start = self.position
+        assert start >= 0
+        self.position = end + 1
+        return self.buffer[start:end]
+
+    def readint(self, prompt):
+        # type: (bytes) -> int
+        self.prompt(prompt)
+        end = self.line_end()
+        if end < 0:
+            raise InputError("Unexpected end of input")
+        start = self.position
+        self.position = end + 1
+        buffer = self.buffer
+        while start < end and buffer[start] in b" \t\r":
+            start += 1
+        while end > start and buffer[end - 1] in b" \t\r":
+            end -= 1
+        sign = 1
+        i = start
+        if i < end and buffer[i] in b"+-":
+            if buffer[i] == b"-":
+                sign = -1
+            i += 1
+        if i == end:
+            raise InputError("Expected an integer")
+        # Accumulate negatively: the most negative integer has no positive
+        # counterpart.
+        value = 0
+        try:
+            while i < end:
+                digit = ord(buffer[i]) - ord(b"0")
+                if digit < 0 or digit > 9:
+                    raise InputError("Expected an integer")
+                value = ovfcheck(value * 10)
+                value = ovfcheck(value - digit)
+                i += 1
+            if sign > 0:
+                value = ovfcheck(-value)
+        except OverflowError:
+            raise InputError("Integer out of range")
+        return value
+
+    def prompt(self, prompt):
+        # type: (bytes) -> None
+        if self.prompts:
+            output.stdout.flush()
+            os.write(1, prompt)
+
+
+stdin = InputReader()
@@ -0,0 +1,94 @@
+"""Resolve identifiers to frame slots ahead of evaluation.
+
+`resolve` numbers every declared identifier and rewrites the body of a parsed
+`ast.Program` so that references, assignments and reads index a list frame.
+Only resolved programs can be evaluated; allocate their frame with
+`Program.new_frame`.
+"""
+import ast
+
+from typing import Dict, Optional  # noqa
+
+
+class ResolveError(Exception):
+    def __init__(self, name):
+        # type: (str) -> None
+        self.name = name
+
+    def __str__(self):
+        # type: () -> str
+        return "Undeclared identifier %s" % self.name
+
+
+class Resolver(object):
+    def __init__(self, decls):
+        # type: (ast.IdentifierList) -> None
+        self.slots = {}  # type: Dict[str, int]
+        for identifier in decls:
+            if identifier.name not in self.slots:
+                self.slots[identifier.name] = len(self.slots)
+
+    def reference(self, node):
+        # type: (ast.IdentifierReference) -> ast.SlotReference
+        if node.name not in self.slots:
+            raise ResolveError(node.name)
+        return ast.SlotReference(node.name, self.slots[node.name])
+
+    def block(self, block):
+        # type: (ast.Block) -> ast.Block
+        return ast.Block([self.statement(statement)
+                          for statement in block.statements])
+
+    def statement(self, node):
+        # type: (ast.ASTNode) -> ast.ASTNode
+        if isinstance(node, ast.Assignment):
+            return ast.SlotAssignment(self.reference(node.identifier),
+                                      self.expression(node.value))
+        elif isinstance(node, ast.ReadStatement):
+            return ast.SlotReadStatement(self.reference(node.target))
+        elif isinstance(node, ast.WriteStatement):
+            return ast.WriteStatement(self.expression(node.value),
+                                      node.newline)
+        elif isinstance(node, ast.WhileStatement):
+            return ast.WhileStatement(self.expression(node.condition),
+                                      self.block(node.body))
+        elif isinstance(node, ast.IfStatement):
+            else_body = None  # type: Optional[ast.Block]
+            if node.else_body is not None:
+                else_body = self.block(node.else_body)
+            return ast.IfStatement(self.expression(node.condition),
+                                   self.block(node.body), else_body)
+        raise AssertionError("Unexpected statement")
+
+    def expression(self, node):
+        # type: (ast.ASTNode) -> ast.ASTNode
+        if isinstance(node, ast.Number):
+            return node
+        elif isinstance(node, ast.IdentifierReference):
+            return self.reference(node)
+        elif isinstance(node, ast.Add):
+            return ast.Add(self.expression(node.left),
+                           self.expression(node.right))
+        elif isinstance(node, ast.Subtract):
+            return ast.Subtract(self.expression(node.left),
+                                self.expression(node.right))
+        elif isinstance(node, ast.Multiply):
+            return ast.Multiply(self.expression(node.left),
+                                self.expression(node.right))
+        elif isinstance(node, ast.Divide):
+            return ast.Divide(self.expression(node.left),
+                              self.expression(node.right))
+        elif isinstance(node, ast.GreaterThan):
+            return ast.GreaterThan(self.expression(node.left),
+                                   self.expression(node.right))
+        elif isinstance(node, ast.EqualTo):
+            return ast.EqualTo(self.expression(node.left),
+                               self.expression(node.right))
+        raise AssertionError("Unexpected expression")
+
+
+def resolve(program):
+    # type: (ast.Program) -> ast.Program
+    resolver = Resolver(program.decls)
+    return ast.Program(program.name, program.decls,
+                       resolver.block(program.body), len(resolver.slots))
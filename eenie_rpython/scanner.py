@@ -0,0 +1,75 @@
+"""A hand-written scanner producing the same tokens as `lexer.lex`.
+
+rply's generated lexer tries every rule's regular expression in turn at each
+position and then looks identifiers up in the `reserved` list. `scan` instead
+dispatches on the current character and finds keywords in a dict, while
+keeping the token names, values and source positions of the rply lexer, which
+stays in `lexer` as the reference implementation.
+"""
+from rply.errors import LexingError
+from rply.token import SourcePosition, Token
+from typing import Dict, Iterator, List, Tuple  # noqa
+
+import lexer
+
+
+WHITESPACE = b" \t\n\r\x0b\x0c"
+DIGITS = b"0123456789"
+LETTERS = b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+ALPHANUMERIC = LETTERS + DIGITS
+
+keywords = {}  # type: Dict[bytes, bytes]
+for keyword in lexer.reserved:
+    keywords[keyword] = keyword.upper()
+
+# Operators by their first character, in the order rply tries them.
+operators = {}  # type: Dict[bytes, List[Tuple[bytes, bytes]]]
+for operator_name, pattern in lexer.operators.items():
+    operator = pattern.replace("\\", "")
+    operators.setdefault(operator[0], []).append((operator, operator_name))
+
+no_operators = []  # type: List[Tuple[bytes, bytes]]
+
+
+def scan(buf):
+    # type: (bytes) -> Iterator[Token]
+    position = 0
+    end = len(buf)
+    lineno = 1
+    line_start = 0
+    if end > 0 and buf[0] == b"#":
+        position = buf.find(b"\n")
+        if position < 0:
+            position = end
+    while True:
+        while position < end and buf[position] in WHITESPACE:
+            if buf[position] == b"\n":
+                lineno += 1
+                line_start = position + 1
+            position += 1
+        if position >= end:
+            return
+        start = position
+        char = buf[position]
+        name = b""
+        if char in DIGITS:
+            position += 1
+            while position < end and buf[position] in DIGITS:
+                position += 1
+            name = b"NUM"
+        elif char in LETTERS:
+            position += 1
+            while position < end and buf[position] in ALPHANUMERIC:
+                position += 1
+            keyword = keywords.get(buf[start:position].lower(), None)
+            name = b"ID" if keyword is None else keyword
+        else:
+            for operator, operator_name in operators.get(char, no_operators):
+                if buf[position:position + len(operator)] == operator:
+                    name = operator_name
+                    position += len(operator)
+                    break
+            if len(name) == 0:
+                raise LexingError(None, SourcePosition(position, -1, -1))
+        yield Token(name, buf[start:position],
+                    SourcePosition(start, lineno, start - line_start + 1))
@@ -1,25 +1,51 @@
 import os
+import stat
 import sys
 
 import ast
-import lexer
 import parser
+import scanner
+import reader
+import resolver
 
-from typing import AnyStr  # noqa
+from typing import AnyStr, List  # noqa
 
 
-def run(fp):
-    # type: (int) -> None
-    program = b""
+BLOCK_SIZE = 65536
+
+
+def read_source(fd):
+    # type: (int) -> bytes
+    """Read everything from `fd` without repeatedly copying the prefix.
+
+    Regular files are read in one request sized by `fstat`; pipes and
+    terminals are read in blocks that are joined once at the end.
+    """
+    size = BLOCK_SIZE
+    st = os.fstat(fd)
+    if stat.S_ISREG(st.st_mode) and st.st_size > 0:
+        size = st.st_size
+    chunks = []  # type: List[bytes]
     while True:
-        read = os.read(fp, 4096)
-        if len(read) == 0:
+        chunk = os.read(fd, size)
+        if len(chunk) == 0:
             break
-        program += read
-    os.close(fp)
-    parsed = parser.parser.parse(lexer.lex(program))
+        chunks.append(chunk)
+        size = BLOCK_SIZE
+    if len(chunks) == 1:
+        return chunks[0]
+    return b"".join(chunks)
+
+
+def run(fp):
+    # type: (int) -> None
+    program = read_source(fp)
+    if fp != 0:
+        os.close(fp)
+    parsed = parser.parser.parse(scanner.scan(program))
     assert isinstance(parsed, ast.Program)
-    parsed.eval({})
+    resolved = resolver.resolve(parsed)
+    resolved.eval(resolved.new_frame())
 
 
 def entry_point(argv):
@@ -29,8 +55,27 @@ def entry_point(argv):
     except IndexError:
         print("You must supply a filename")
         return 1
+    if len(argv) > 2:
+        # Batch mode: every read statement takes the next line of the
+        # inputs file, and no prompts are written.
+        reader.stdin.feed(os.open(argv[2], os.O_RDONLY, 0o777))
+
+    if filename == "-":
+        fd = 0
+    else:
+        fd = os.open(filename, os.O_RDONLY, 0o777)
 
-    run(os.open(filename, os.O_RDONLY, 0o777))
+    try:
+        run(fd)
+    except resolver.ResolveError as e:
+        print("Undeclared identifier %s" % e.name)
+        return 1
+    except reader.InputError as e:
+        print(e.message)
+        return 1
+    except ast.ArithmeticFailure as e:
+        print("%s in %s" % (e.description, e.operator))
+        return 1
     return 0
 
 
@@ -38,5 +83,10 @@ def target(*args):
     return entry_point, None
 
 
+def jitpolicy(driver):
+    from rpython.jit.codewriter.policy import JitPolicy
+    return JitPolicy()
+
+
 if __name__ == "__main__":
-    entry_point(sys.argv)
+    sys.exit(entry_point(sys.argv))
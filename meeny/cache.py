@@ -0,0 +1,214 @@
+"""A content-addressed on-disk cache of prepared programs.
+
+`ProgramCache.load` turns a program's source into what an engine runs: the
+resolved tree for `tree`, the bytecode for `vm` and the translated function
+for `python`. Prepared programs are stored under a hash of the source, the
+engine, whether the program was optimized, the Python version and a
+fingerprint of the modules that build them, so that a change to the grammar,
+the tree or a compiler never brings back stale entries. A hit unpickles the
+stored program without lexing or parsing the source.
+
+Entries are zlib-compressed pickles, one file each. They are written to a
+temporary file in the cache directory and renamed into place, so concurrent
+processes only ever see complete entries. Every hit touches the entry's
+modification time, and after every write the least recently used entries
+are removed until the cache fits in `max_bytes`.
+"""
+import errno
+import hashlib
+import os
+import sys
+import tempfile
+import zlib
+
+from rply.token import SourcePosition
+
+import ast
+import lexer
+import optimizer
+import parser
+import resolver
+import scanner
+import transpile
+import vm
+
+try:
+    import cPickle as pickle
+    import copy_reg as copyreg
+except ImportError:
+    import pickle
+    import copyreg
+
+FORMAT_VERSION = 1
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+SUFFIX = ".program"
+
+engines = {
+    "tree": resolver.resolve,
+    "vm": vm.compile_program,
+    "python": transpile.compile_program,
+}
+
+replace = getattr(os, "replace", os.rename)
+
+
+def reduce_source_position(source_pos):
+    return SourcePosition, (source_pos.idx, source_pos.lineno,
+                            source_pos.colno)
+
+
+# Every node keeps one; pickled as plain objects they would make up half of
+# an entry.
+copyreg.pickle(SourcePosition, reduce_source_position)
+
+_fingerprint = None
+
+
+def fingerprint():
+    """A hash of the source of every module that shapes a cached program."""
+    global _fingerprint
+    if _fingerprint is None:
+        digest = hashlib.sha1()
+        for module in (ast, lexer, optimizer, parser, resolver, scanner,
+                       transpile, vm):
+            with open(os.path.splitext(module.__file__)[0] + ".py", "rb") as f:
+                digest.update(f.read())
+        _fingerprint = digest.hexdigest()
+    return _fingerprint
+
+
+def default_directory():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "meeny")
+
+
+def prepare(source, engine="tree", optimize=False):
+    """Lex, parse and prepare `source` for `engine` without the cache."""
+    program = parser.parse(scanner.scan(source))
+    if optimize:
+        program, _ = optimizer.optimize(program)
+    return engines[engine](program)
+
+
+class ProgramCache(object):
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_directory()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        try:
+            os.makedirs(self.directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+    def key(self, source, engine="tree", optimize=False):
+        digest = hashlib.sha256()
+        digest.update(("%d:%s:%d.%d:%s:%d\n" % (
+            FORMAT_VERSION, fingerprint(), sys.version_info[0],
+            sys.version_info[1], engine, optimize)).encode("ascii"))
+        digest.update(source.encode("utf-8") if not isinstance(source, bytes)
+                      else source)
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def get(self, key):
+        """The program stored under `key`, or None."""
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except (IOError, OSError) as e:
+            if e.errno != errno.ENOENT:
+                raise
+            self.misses += 1
+            return None
+        try:
+            program = pickle.loads(zlib.decompress(data))
+        except Exception:
+            # Unreadable entries are dropped and rebuilt.
+            self.remove(path)
+            self.misses += 1
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        self.hits += 1
+        return program
+
+    def put(self, key, program):
+        data = zlib.compress(pickle.dumps(program, pickle.HIGHEST_PROTOCOL))
+        fd, temporary = tempfile.mkstemp(dir=self.directory, prefix=".",
+                                         suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            replace(temporary, self.path(key))
+        except BaseException:
+            self.remove(temporary)
+            raise
+        self.evict()
+
+    def load(self, source, engine="tree", optimize=False):
+        """The prepared program for `source`, from the cache if possible."""
+        key = self.key(source, engine, optimize)
+        program = self.get(key)
+        if program is None:
+            program = prepare(source, engine, optimize)
+            self.put(key, program)
+        return program
+
+    def entries(self):
+        """`(modification time, size, path)` of every entry."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits."""
+        entries = sorted(self.entries())
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in entries:
+            if size <= self.max_bytes:
+                break
+            if self.remove(path):
+                self.evictions += 1
+            size -= entry_size
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            return False
+        return True
+
+    def clear(self):
+        for _, _, path in self.entries():
+            self.remove(path)
+
+    def stats(self):
+        entries = self.entries()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(entries),
+            "bytes": sum(entry[1] for entry in entries),
+        }
@@ -0,0 +1,51 @@
+"""Compile a meeny program once and run it many times from Python.
+
+`compile` lexes, parses and prepares a source for one engine and returns an
+immutable `Executable`. `Executable.run` evaluates it with the given inputs
+handed to its `read` statements in order, without prompting, and returns
+everything it wrote. Each run starts from fresh variables, so running again
+costs nothing but the evaluation itself.
+
+Runs swap the module-level `output.sink` and `reader.source` while they
+last, so executables must be run from one thread at a time.
+"""
+import attr
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+import cache
+import output
+import reader
+
+
+@attr.s(frozen=True, slots=True)
+class Executable(object):
+    name = attr.ib()
+    engine = attr.ib()
+    program = attr.ib(repr=False)
+
+    def run(self, inputs=(), context=None):
+        """Run with `inputs` and return the output.
+
+        The final values of the variables are stored in `context` if given.
+        """
+        collected = StringIO()
+        previous_sink = output.redirect(collected)
+        previous_source = reader.redirect(reader.Inputs(inputs))
+        try:
+            if self.engine == "tree":
+                self.program.eval({} if context is None else context)
+            else:
+                self.program.run({} if context is None else context)
+        finally:
+            reader.redirect(previous_source)
+            output.redirect(previous_sink)
+        return collected.getvalue()
+
+
+def compile(source, engine="tree", optimize=False):
+    program = cache.prepare(source, engine, optimize)
+    return Executable(program.name, engine, program)
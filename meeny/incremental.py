@@ -0,0 +1,282 @@
+"""Reparse a meeny program after an edit to its source, reusing what it can.
+
+`parse` returns a program with the list of tokens it was parsed from.
+`reparse` takes them, the source and an edit that replaces `removed`
+characters at `offset` with `inserted`, and returns the program, tokens and
+source after the edit, exactly as `parse` gives them for the new source, down
+to the source positions.
+
+Only the text around the edit is scanned again, from the first token it
+touches until the new tokens line up with the old ones. The run of statements
+covering the changed tokens in the innermost statement list that holds them
+(the body of the program, a `while` or an `if`) is then parsed on its own and
+spliced into the tree, everything else being kept. If the run does not parse
+by itself, the run of the enclosing list is tried, and so on up to the
+program body. Edits outside the body and source that does not parse fall
+back to a full parse, so that `reparse` raises whatever `parse` would.
+
+The program and tokens given to `reparse` are updated in place, unless it
+raises, and are only valid for the new source afterwards. Tokens and nodes
+share their source positions, and the positions past a gap in the tokens are
+kept relative to the end of the source, so an edit leaves them as they are.
+The gap moves to each edit, so that the positions updated are those of the
+edited line and of the tokens between the edit and the one before it: as
+an editor makes its edits, a few statements at a time.
+"""
+from rply.errors import LexingError, ParsingError
+from rply.token import SourcePosition, Token
+
+import ast
+import parser
+import scanner
+
+# What a statement list is wrapped in to be parsed as a program.
+HEAD = [Token("PROGRAM", "program"), Token("ID", "p"), Token("HAS", "has"),
+        Token("DECLS", "decls"), Token("INT", "int"), Token("ID", "x"),
+        Token("BODY", "body")]
+TAIL = [Token("END", "end"), Token("ID", "p")]
+
+
+def start_of(token):
+    return token.source_pos.idx
+
+
+def end_of(token):
+    return token.source_pos.idx + len(token.value)
+
+
+def count_before(items, position, key):
+    """The number of `items`, sorted by `key`, whose `key` is below
+    `position`."""
+    low, high = 0, len(items)
+    while low < high:
+        middle = (low + high) // 2
+        if key(items[middle]) < position:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+class Tokens(list):
+    """The tokens of a source, with the length and line count that the
+    positions of the tokens from index `gap` on are relative to."""
+
+    def __init__(self, source):
+        list.__init__(self)
+        self.length = len(source)
+        self.lines = source.count("\n")
+        self.gap = 0
+
+    def move_gap(self, index):
+        """Make the positions before `index` absolute and the rest relative
+        to the end of the source."""
+        length, lines = self.length, self.lines
+        if index > self.gap:
+            changed, tail = self[self.gap:index], False
+        else:
+            changed, tail = self[index:self.gap], True
+        for token in changed:
+            position = token.source_pos
+            position.offset = length - position.offset
+            position.line = lines - position.line
+            position.tail = tail
+        self.gap = index
+
+    def edited(self, first, stop, replacement, delta, lines):
+        """Replace tokens `first` to `stop`, moving those after them by
+        `delta` characters and `lines` lines."""
+        self.move_gap(stop)
+        self.length += delta
+        self.lines += lines
+        self[first:stop] = replacement
+        self.gap = first + len(replacement)
+
+
+class Position(SourcePosition):
+    """The source position of a token in `tokens`, which stays right as the
+    source before it is edited."""
+
+    def __init__(self, tokens, idx, lineno, colno):
+        self.tokens = tokens
+        self.offset = idx
+        self.line = lineno
+        self.colno = colno
+        self.tail = False
+
+    @property
+    def idx(self):
+        if self.tail:
+            return self.tokens.length - self.offset
+        return self.offset
+
+    @idx.setter
+    def idx(self, idx):
+        self.offset = self.tokens.length - idx if self.tail else idx
+
+    @property
+    def lineno(self):
+        if self.tail:
+            return self.tokens.lines - self.line
+        return self.line
+
+    @lineno.setter
+    def lineno(self, lineno):
+        self.line = self.tokens.lines - lineno if self.tail else lineno
+
+    def __reduce__(self):
+        return SourcePosition, (self.idx, self.lineno, self.colno)
+
+
+def spans(tokens, source, position=0, lineno=1, line_start=0):
+    """Scan `source` from `position` into tokens with positions in
+    `tokens`."""
+    for name, start, end, lineno, colno in scanner.spans(
+            source, position, lineno, line_start):
+        yield start, end, Token(name, source[start:end],
+                                Position(tokens, start, lineno, colno))
+
+
+def parse(source):
+    """The program in `source` and the list of its tokens."""
+    tokens = Tokens(source)
+
+    def collect():
+        for _, _, token in spans(tokens, source):
+            tokens.append(token)
+            yield token
+
+    program = parser.parse(collect())
+    tokens.gap = len(tokens)
+    return program, tokens
+
+
+class Splice(object):
+    """The old tokens `first` to `stop` replaced by `replacement`."""
+
+    def __init__(self, tokens, first, stop, replacement):
+        self.tokens = tokens
+        self.first = first
+        self.stop = stop
+        self.replacement = replacement
+
+    def index(self, node):
+        return count_before(self.tokens, node.source_pos.idx, start_of)
+
+    def statements(self, statements, end):
+        """Reparse the changed run of `statements`, a list ending before old
+        token `end`; return False if it does not parse on its own."""
+        first, stop, index = self.first, self.stop, self.index
+        if stop > first:
+            i = max(count_before(statements, first + 1, index) - 1, 0)
+            j = count_before(statements, stop, index) - 1
+        else:
+            i = max(count_before(statements, first, index) - 1, 0)
+            j = max(count_before(statements, first + 1, index) - 1, 0)
+        start = self.index(statements[i])
+        if j + 1 < len(statements):
+            end = self.index(statements[j + 1])
+        if i == j and self.nested(statements[i], end):
+            return True
+        region = (self.tokens[start:first] + self.replacement +
+                  self.tokens[stop:end])
+        try:
+            program = parser.parse(iter(HEAD + region + TAIL))
+        except ParsingError:
+            return False
+        statements[i:j + 1] = program.body
+        return True
+
+    def nested(self, statement, end):
+        """Reparse within a body of `statement`, which ends before old token
+        `end`, if the changed tokens are all in one."""
+        if isinstance(statement, ast.WhileStatement):
+            bodies = [(statement.body, end - 1)]
+        elif isinstance(statement, ast.IfStatement):
+            if statement.else_body:
+                bodies = [
+                    (statement.body, self.index(statement.else_body[0]) - 1),
+                    (statement.else_body, end - 1)]
+            else:
+                bodies = [(statement.body, end - 1)]
+        else:
+            return False
+        for body, body_end in bodies:
+            if (self.index(body[0]) <= self.first and
+                    self.stop <= body_end):
+                return self.statements(body, body_end)
+        return False
+
+
+def rescan(tokens, source, new_source, offset, removed, inserted):
+    """The old tokens the edit changed, as `(first, stop)`, and the tokens
+    replacing them."""
+    old_end = offset + removed
+    new_end = offset + len(inserted)
+    delta = len(inserted) - removed
+    first = count_before(tokens, offset, end_of)
+    stop = count_before(tokens, old_end + 1, start_of)
+    if first < len(tokens) and start_of(tokens[first]) <= offset:
+        start = start_of(tokens[first])
+    else:
+        start = offset
+    anchor = tokens[first - 1].source_pos
+    lineno = anchor.lineno + source.count("\n", anchor.idx, start)
+    line_start = source.rfind("\n", 0, start) + 1
+    replacement = []
+    for token_start, token_end, token in spans(tokens, new_source, start,
+                                               lineno, line_start):
+        if token_start >= new_end:
+            while (stop < len(tokens) and
+                   start_of(tokens[stop]) + delta < token_start):
+                stop += 1
+            if stop < len(tokens):
+                old = tokens[stop]
+                if (start_of(old) + delta == token_start and
+                        old.name == token.name and
+                        len(old.value) == token_end - token_start):
+                    break
+        replacement.append(token)
+    else:
+        stop = len(tokens)
+    return first, stop, replacement
+
+
+def reparse(program, tokens, source, offset, removed, inserted):
+    """Apply an edit to `source` and return the new program, tokens and
+    source."""
+    new_source = source[:offset] + inserted + source[offset + removed:]
+    body_start = count_before(tokens, program.body[0].source_pos.idx,
+                              start_of)
+    if offset <= end_of(tokens[body_start - 1]):
+        program, tokens = parse(new_source)
+        return program, tokens, new_source
+    try:
+        first, stop, replacement = rescan(tokens, source, new_source, offset,
+                                          removed, inserted)
+    except LexingError:
+        first = None
+    body_end = len(tokens) - 2
+    if first is None or stop > body_end or (
+            (replacement or stop > first) and
+            not Splice(tokens, first, stop, replacement).statements(
+                program.body, body_end)):
+        program, tokens = parse(new_source)
+        return program, tokens, new_source
+    old_end = offset + removed
+    new_end = offset + len(inserted)
+    anchor = tokens[first - 1].source_pos
+    line = anchor.lineno + source.count("\n", anchor.idx, old_end)
+    columns = ((new_end - new_source.rfind("\n", 0, new_end)) -
+               (old_end - source.rfind("\n", 0, old_end)))
+    lines = inserted.count("\n") - source.count("\n", offset, old_end)
+    # Columns are absolute: move those after the edit on its last line.
+    index = stop
+    while index < len(tokens):
+        position = tokens[index].source_pos
+        if position.lineno != line:
+            break
+        position.colno += columns
+        index += 1
+    tokens.edited(first, stop, replacement, len(inserted) - removed, lines)
+    return program, tokens, new_source
@@ -0,0 +1,499 @@
+"""Constant folding and algebraic simplification for parsed meeny programs.
+
+`optimize` takes an `ast.Program` straight from the parser and returns an
+equivalent program together with the number of AST nodes it eliminated:
+
+* binary operations over two `Number` operands are folded, except division
+  and modulo by zero, which are left to fail at run time;
+* `x + 0`, `0 + x`, `x - 0`, `x * 1`, `1 * x` and `x / 1` are reduced to `x`
+  when `x` is known to hold an integer at that point;
+* `if` statements with a constant condition are replaced by the branch that
+  runs, and `while` loops with a constant false condition are dropped.
+
+Comparisons evaluate to booleans, which `write` prints as `True`/`False`, so
+a comparison is only folded where its value is used as a number or tested as
+a condition. For the same reason, and because variables hold `None` until
+they are first assigned, an identity is only removed when its operand is an
+integer: a number, an arithmetic result, or a variable that is assigned on
+every path to the use and only ever assigned integers.
+
+The simplified program then goes through `LoopOptimizer`:
+
+* loop-invariant code motion: the largest subexpressions of a `while`
+  condition and body that read no variable the loop assigns are computed once
+  into temporaries before the loop;
+* strength reduction: products of an induction variable, one the loop body
+  steps by a constant exactly once at its top level, and an invariant are
+  kept in temporaries that are stepped along with it, where a loop has two or
+  more of the same product.
+
+Hoisted code runs before the loop even when the loop or the branch holding
+the expression would not have run, so only expressions that cannot fail are
+moved: their variables must hold a value on every path to the loop, and they
+may only divide by nonzero constants. Reads, writes and errors therefore
+happen exactly as before. Temporaries are declared with the initial value 0
+under names such as `_t0`, which no meeny identifier can take, and so never
+trigger the warning for unused identifiers.
+"""
+import collections
+import operator
+
+import ast
+
+
+folders = {
+    ast.Add: operator.add,
+    ast.Subtract: operator.sub,
+    ast.Multiply: operator.mul,
+    ast.Divide: operator.floordiv,
+    ast.Modulo: operator.mod,
+    ast.GreaterThan: operator.gt,
+    ast.EqualTo: operator.eq,
+}
+
+arithmetic = (ast.Add, ast.Subtract, ast.Multiply, ast.Divide, ast.Modulo)
+comparisons = (ast.GreaterThan, ast.EqualTo)
+
+
+def count_nodes(node):
+    if node is None:
+        return 0
+    elif isinstance(node, list):
+        return sum(count_nodes(child) for child in node)
+    elif isinstance(node, ast.Program):
+        return 1 + count_nodes(node.body)
+    elif isinstance(node, ast.BinaryOperation):
+        return 1 + count_nodes(node.left) + count_nodes(node.right)
+    elif isinstance(node, ast.Assignment):
+        return 1 + count_nodes(node.identifier) + count_nodes(node.value)
+    elif isinstance(node, ast.ReadStatement):
+        return 1 + count_nodes(node.target)
+    elif isinstance(node, ast.WriteStatement):
+        return 1 + count_nodes(node.value)
+    elif isinstance(node, ast.WhileStatement):
+        return 1 + count_nodes(node.condition) + count_nodes(node.body)
+    elif isinstance(node, ast.IfStatement):
+        return (1 + count_nodes(node.condition) + count_nodes(node.body) +
+                count_nodes(node.else_body))
+    return 1
+
+
+def assigned_values(statements):
+    """Yield (name, value) for every assignment; reads yield a `None` value."""
+    for statement in statements or ():
+        if isinstance(statement, ast.Assignment):
+            yield statement.identifier.name, statement.value
+        elif isinstance(statement, ast.ReadStatement):
+            yield statement.target.name, None
+        elif isinstance(statement, ast.WhileStatement):
+            for pair in assigned_values(statement.body):
+                yield pair
+        elif isinstance(statement, ast.IfStatement):
+            for pair in assigned_values(statement.body):
+                yield pair
+            for pair in assigned_values(statement.else_body):
+                yield pair
+
+
+class Optimizer(object):
+    def __init__(self, program):
+        self.program = program
+        self.integers = self.integer_variables(program)
+
+    @staticmethod
+    def integer_variables(program):
+        """Find the variables that are never assigned a comparison result."""
+        assignments = list(assigned_values(program.body))
+        integers = set(identifier.name for identifier in program.decls)
+        changed = True
+        while changed:
+            changed = False
+            for name, value in assignments:
+                if name in integers and value is not None and not (
+                        isinstance(value, (ast.Number,) + arithmetic) or
+                        isinstance(value, ast.IdentifierReference) and
+                        value.name in integers):
+                    integers.discard(name)
+                    changed = True
+        return integers
+
+    # Flow analysis. `defined` is the set of variables that hold a value
+    # other than `None` at a given point of the program.
+
+    @staticmethod
+    def holds_value(node, defined):
+        if isinstance(node, ast.IdentifierReference):
+            return node.name in defined
+        return True
+
+    def flow(self, statements, defined):
+        for statement in statements or ():
+            defined = self.flow_statement(statement, defined)
+        return defined
+
+    def flow_statement(self, node, defined):
+        if isinstance(node, ast.Assignment):
+            if self.holds_value(node.value, defined):
+                return defined | set([node.identifier.name])
+            return defined - set([node.identifier.name])
+        elif isinstance(node, ast.ReadStatement):
+            return defined | set([node.target.name])
+        elif isinstance(node, ast.WhileStatement):
+            return self.loop_entry(node, defined)
+        elif isinstance(node, ast.IfStatement):
+            return (self.flow(node.body, defined) &
+                    self.flow(node.else_body, defined))
+        return defined
+
+    def loop_entry(self, node, defined):
+        """Variables holding a value every time the loop condition is tested."""
+        entry = defined
+        while True:
+            following = entry & self.flow(node.body, entry)
+            if following == entry:
+                return entry
+            entry = following
+
+    # Rewriting.
+
+    def is_integer(self, node, defined):
+        if isinstance(node, ast.Number):
+            return True
+        elif isinstance(node, ast.IdentifierReference):
+            return node.name in defined and node.name in self.integers
+        return isinstance(node, arithmetic)
+
+    def statements(self, statements, defined):
+        result = []
+        for statement in statements or ():
+            result.extend(self.statement(statement, defined))
+            defined = self.flow_statement(statement, defined)
+        return result
+
+    def statement(self, node, defined):
+        """Return the list of statements replacing `node`."""
+        if isinstance(node, ast.Assignment):
+            return [ast.Assignment(node.identifier,
+                                   self.expression(node.value, defined, False),
+                                   node.source_pos)]
+        elif isinstance(node, ast.WriteStatement):
+            if not node.value:
+                return [node]
+            return [ast.WriteStatement(
+                self.expression(node.value, defined, False),
+                node.newline, node.source_pos)]
+        elif isinstance(node, ast.WhileStatement):
+            entry = self.loop_entry(node, defined)
+            condition = self.expression(node.condition, entry, True)
+            if isinstance(condition, ast.Number) and not condition.value:
+                return []
+            return [ast.WhileStatement(condition,
+                                       self.statements(node.body, entry),
+                                       node.source_pos)]
+        elif isinstance(node, ast.IfStatement):
+            condition = self.expression(node.condition, defined, True)
+            body = self.statements(node.body, defined)
+            else_body = self.statements(node.else_body, defined)
+            if isinstance(condition, ast.Number):
+                return body if condition.value else else_body
+            return [ast.IfStatement(condition, body,
+                                    else_body if node.else_body else None,
+                                    node.source_pos)]
+        return [node]
+
+    def expression(self, node, defined, numeric):
+        """Simplify an expression.
+
+        `numeric` is true where only the numeric value of `node` matters, so
+        that a comparison may be replaced by the number 0 or 1.
+        """
+        if not isinstance(node, ast.BinaryOperation):
+            return node
+        kind = type(node)
+        left = self.expression(node.left, defined, True)
+        right = self.expression(node.right, defined, True)
+        if isinstance(left, ast.Number) and isinstance(right, ast.Number):
+            if kind in (ast.Divide, ast.Modulo) and right.value == 0:
+                return kind(left, right, node.source_pos)
+            if kind in comparisons and not numeric:
+                return kind(left, right, node.source_pos)
+            return ast.Number(folders[kind](left.value, right.value),
+                              node.source_pos)
+        if isinstance(right, ast.Number) and self.is_integer(left, defined):
+            if (right.value == 0 and kind in (ast.Add, ast.Subtract) or
+                    right.value == 1 and kind in (ast.Multiply, ast.Divide)):
+                return left
+        if isinstance(left, ast.Number) and self.is_integer(right, defined):
+            if (left.value == 0 and kind is ast.Add or
+                    left.value == 1 and kind is ast.Multiply):
+                return right
+        return kind(left, right, node.source_pos)
+
+    def optimize(self):
+        program = self.program
+        defined = set(identifier.name for identifier in program.decls
+                      if identifier.value is not None)
+        return ast.Program(program.name, program.decls,
+                           self.statements(program.body, defined))
+
+
+def map_expressions(statements, function):
+    """Copy `statements`, replacing every expression by `function` of it."""
+    if statements is None:
+        return None
+    result = []
+    for node in statements:
+        if isinstance(node, ast.Assignment):
+            node = ast.Assignment(node.identifier, function(node.value),
+                                  node.source_pos)
+        elif isinstance(node, ast.WriteStatement) and node.value:
+            node = ast.WriteStatement(function(node.value), node.newline,
+                                      node.source_pos)
+        elif isinstance(node, ast.WhileStatement):
+            node = ast.WhileStatement(function(node.condition),
+                                      map_expressions(node.body, function),
+                                      node.source_pos)
+        elif isinstance(node, ast.IfStatement):
+            node = ast.IfStatement(function(node.condition),
+                                   map_expressions(node.body, function),
+                                   map_expressions(node.else_body, function),
+                                   node.source_pos)
+        result.append(node)
+    return result
+
+
+def subexpressions(node):
+    """Yield `node` and every expression in it."""
+    yield node
+    if isinstance(node, ast.BinaryOperation):
+        for child in subexpressions(node.left):
+            yield child
+        for child in subexpressions(node.right):
+            yield child
+
+
+def expressions(statements):
+    """Yield the expressions of `statements`, nested statements included."""
+    for node in statements or ():
+        if isinstance(node, ast.Assignment):
+            yield node.value
+        elif isinstance(node, ast.WriteStatement) and node.value:
+            yield node.value
+        elif isinstance(node, ast.WhileStatement):
+            yield node.condition
+            for expression in expressions(node.body):
+                yield expression
+        elif isinstance(node, ast.IfStatement):
+            yield node.condition
+            for expression in expressions(node.body):
+                yield expression
+            for expression in expressions(node.else_body):
+                yield expression
+
+
+class LoopOptimizer(Optimizer):
+    """Loop-invariant code motion and strength reduction; see above."""
+
+    # The number of uses of a product that make stepping it worthwhile.
+    min_products = 2
+
+    def __init__(self, program):
+        Optimizer.__init__(self, program)
+        self.temporaries = []
+        self.temporary_names = set()
+
+    def temporary(self):
+        name = "_t%d" % len(self.temporaries)
+        self.temporaries.append(ast.Identifier(name, 0))
+        self.temporary_names.add(name)
+        return name
+
+    def holds_value(self, node, defined):
+        if (isinstance(node, ast.IdentifierReference) and
+                node.name in self.temporary_names):
+            return True
+        return Optimizer.holds_value(node, defined)
+
+    def invariant(self, node, assigned, defined):
+        """Whether `node` has the same value all through a loop assigning
+        `assigned`, and can be computed before it without failing."""
+        if isinstance(node, ast.Number):
+            return True
+        elif isinstance(node, ast.IdentifierReference):
+            return node.name not in assigned and (
+                node.name in defined or node.name in self.temporary_names)
+        elif isinstance(node, ast.BinaryOperation):
+            if isinstance(node, (ast.Divide, ast.Modulo)) and not (
+                    isinstance(node.right, ast.Number) and node.right.value):
+                return False
+            return (self.invariant(node.left, assigned, defined) and
+                    self.invariant(node.right, assigned, defined))
+        return False
+
+    def hoist(self, node, assigned, defined, hoisted):
+        """Replace the largest invariant operations in `node` by temporaries
+        computed before the loop, recording `(name, value)` in `hoisted`."""
+        if not isinstance(node, ast.BinaryOperation):
+            return node
+        if self.invariant(node, assigned, defined):
+            for name, value in hoisted:
+                if value == node:
+                    break
+            else:
+                name = self.temporary()
+                hoisted.append((name, node))
+            return ast.IdentifierReference(name, node.source_pos)
+        return type(node)(self.hoist(node.left, assigned, defined, hoisted),
+                          self.hoist(node.right, assigned, defined, hoisted),
+                          node.source_pos)
+
+    @staticmethod
+    def induction_step(node):
+        """The variable `node` steps by a constant, and the step, if any."""
+        if not isinstance(node, ast.Assignment):
+            return None
+        name, value = node.identifier.name, node.value
+        if not isinstance(value, (ast.Add, ast.Subtract)):
+            return None
+        left, right = value.left, value.right
+        if (isinstance(left, ast.IdentifierReference) and left.name == name and
+                isinstance(right, ast.Number)):
+            step = right.value
+        elif (isinstance(value, ast.Add) and isinstance(left, ast.Number) and
+                isinstance(right, ast.IdentifierReference) and
+                right.name == name):
+            step = left.value
+        else:
+            return None
+        return name, -step if isinstance(value, ast.Subtract) else step
+
+    def factor(self, node, name, assigned, defined):
+        """The invariant `node` multiplies variable `name` by, if any."""
+        if not isinstance(node, ast.Multiply):
+            return None
+        for variable, factor in ((node.left, node.right),
+                                 (node.right, node.left)):
+            if (isinstance(variable, ast.IdentifierReference) and
+                    variable.name == name and
+                    isinstance(factor, (ast.Number,
+                                        ast.IdentifierReference)) and
+                    self.invariant(factor, assigned, defined)):
+                return factor
+        return None
+
+    def reduce_strength(self, condition, body, defined, hoisted):
+        """Replace products of induction variables and invariants in the
+        loop by stepped temporaries; return the new condition and body."""
+        assignments = collections.Counter(
+            name for name, _ in assigned_values(body))
+        assigned = set(assignments)
+        for position, statement in enumerate(body):
+            induction = self.induction_step(statement)
+            if induction is None:
+                continue
+            name, step = induction
+            if assignments[name] != 1 or name not in defined:
+                continue
+            factors = []
+            uses = collections.Counter()
+            for node in [condition] + list(expressions(body)):
+                for child in subexpressions(node):
+                    factor = self.factor(child, name, assigned, defined)
+                    if factor is None:
+                        continue
+                    for index, known in enumerate(factors):
+                        if known == factor:
+                            break
+                    else:
+                        index = len(factors)
+                        factors.append(factor)
+                    uses[index] += 1
+            products = {}
+            updates = []
+            for index, factor in enumerate(factors):
+                if uses[index] < self.min_products:
+                    continue
+                product = self.temporary()
+                products[index] = product
+                source_pos = statement.source_pos
+                hoisted.append((product, ast.Multiply(
+                    ast.IdentifierReference(name, source_pos), factor,
+                    source_pos)))
+                if isinstance(factor, ast.Number):
+                    increment = ast.Number(step * factor.value, source_pos)
+                else:
+                    increment = ast.IdentifierReference(self.temporary(),
+                                                        source_pos)
+                    hoisted.append((increment.name, ast.Multiply(
+                        ast.Number(step, source_pos), factor, source_pos)))
+                updates.append(ast.Assignment(
+                    ast.IdentifierReference(product, source_pos),
+                    ast.Add(ast.IdentifierReference(product, source_pos),
+                            increment, source_pos),
+                    source_pos))
+            if not products:
+                continue
+
+            def replace(node):
+                if not isinstance(node, ast.BinaryOperation):
+                    return node
+                factor = self.factor(node, name, assigned, defined)
+                if factor is not None:
+                    for index, product in products.items():
+                        if factors[index] == factor:
+                            return ast.IdentifierReference(product,
+                                                           node.source_pos)
+                return type(node)(replace(node.left), replace(node.right),
+                                  node.source_pos)
+
+            condition = replace(condition)
+            body = map_expressions(body, replace)
+            body[position + 1:position + 1] = updates
+            # Later inductions are found by position in the new body.
+            return self.reduce_strength(condition, body, defined, hoisted)
+        return condition, body
+
+    def statement(self, node, defined):
+        if isinstance(node, ast.WhileStatement):
+            assigned = set(name for name, _ in assigned_values(node.body))
+            hoisted = []
+
+            def hoist(expression):
+                return self.hoist(expression, assigned, defined, hoisted)
+
+            condition = hoist(node.condition)
+            body = map_expressions(node.body, hoist)
+            condition, body = self.reduce_strength(condition, body, defined,
+                                                   hoisted)
+            entry = self.loop_entry(node, defined)
+            loop = ast.WhileStatement(condition,
+                                      self.statements(body, entry),
+                                      node.source_pos)
+            return [ast.Assignment(ast.IdentifierReference(name,
+                                                           value.source_pos),
+                                   value, value.source_pos)
+                    for name, value in hoisted] + [loop]
+        elif isinstance(node, ast.IfStatement):
+            return [ast.IfStatement(
+                node.condition, self.statements(node.body, defined),
+                node.else_body and self.statements(node.else_body, defined),
+                node.source_pos)]
+        return [node]
+
+    def optimize(self):
+        program = self.program
+        defined = set(identifier.name for identifier in program.decls
+                      if identifier.value is not None)
+        body = self.statements(program.body, defined)
+        return ast.Program(program.name, program.decls + self.temporaries,
+                           body)
+
+
+def optimize(program):
+    """Return the optimized program and the number of nodes eliminated.
+
+    Nodes added by `LoopOptimizer` are not counted against those eliminated.
+    """
+    simplified = Optimizer(program).optimize()
+    eliminated = count_nodes(program) - count_nodes(simplified)
+    return LoopOptimizer(simplified).optimize(), eliminated
@@ -0,0 +1,65 @@
+"""Buffered destination for program output.
+
+Everything a program writes goes through `sink`, which collects the text and
+hands it to its target in chunks of at least `limit` characters. The
+evaluators flush it before prompting for input and when a program finishes.
+
+The target of a sink is either `None` (whatever `sys.stdout` is at flush
+time), a file descriptor, or any object with a `write` method such as a
+`StringIO` instance; use `redirect` to swap the active sink.
+"""
+import os
+import sys
+
+
+DEFAULT_LIMIT = 8192
+
+
+class OutputSink(object):
+    def __init__(self, target=None, limit=DEFAULT_LIMIT):
+        self.target = target
+        self.limit = limit
+        self.chunks = []
+        self.size = 0
+
+    def write(self, text):
+        self.chunks.append(text)
+        self.size += len(text)
+        if self.size >= self.limit:
+            self.flush()
+
+    def flush(self):
+        if not self.chunks:
+            return
+        data = "".join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        if self.target is None:
+            sys.stdout.write(data)
+            sys.stdout.flush()
+        elif isinstance(self.target, int):
+            if not isinstance(data, bytes):
+                data = data.encode("utf-8")
+            while data:
+                data = data[os.write(self.target, data):]
+        else:
+            self.target.write(data)
+
+
+sink = OutputSink()
+
+
+def redirect(target=None, limit=DEFAULT_LIMIT):
+    """Flush the active sink and replace it; returns the previous one.
+
+    `target` may also be an `OutputSink`, such as one returned by an earlier
+    call, which then becomes the active sink as it is.
+    """
+    global sink
+    previous = sink
+    previous.flush()
+    if isinstance(target, OutputSink):
+        sink = target
+    else:
+        sink = OutputSink(target, limit)
+    return previous
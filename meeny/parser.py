@@ -1,6 +1,7 @@
+import attr
 from rply import ParserGenerator
 
-from lexer import token_names, lex
+from lexer import token_names
 import ast
 
 pg = ParserGenerator(
@@ -9,7 +10,8 @@ pg = ParserGenerator(
         ("left", ["ANGLE_R", "EQUAL", "NOT_EQUAL"]),
         ("left", ["PLUS", "MINUS"]),
         ("left", ["ASTERISK", "DIVIDE", "PERCENT"]),
-    ]
+    ],
+    cache_id="meeny"
 )
 
 
@@ -49,12 +51,14 @@ def declist_int(p):
 
 @pg.production('declist : declist INT varlst')
 def declist_list(p):
-    return p[0] + p[2]
+    p[0].extend(p[2])
+    return p[0]
 
 
 @pg.production('varlst : varlst COMMA ID')
 def varlst_varlst(p):
-    return p[0] + [ast.Identifier(p[2].getstr())]
+    p[0].append(ast.Identifier(p[2].getstr()))
+    return p[0]
 
 
 @pg.production('varlst : ID')
@@ -70,7 +74,8 @@ def stmtlist_stmt(p):
 
 @pg.production('stmtlst : stmtlst stmt')
 def stmtlist_stmtlist(p):
-    return p[0] + [p[1]]
+    p[0].append(p[1])
+    return p[0]
 
 
 @pg.production('stmt : WRITE PAREN_L exp PAREN_R')
@@ -79,36 +84,42 @@ def stmtlist_stmtlist(p):
 def write_statement(p):
     return ast.WriteStatement(
         p[2] if len(p) > 1 else None,
-        newline=True if p[0].gettokentype() == "WRITELN" else False
+        newline=True if p[0].gettokentype() == "WRITELN" else False,
+        source_pos=p[0].getsourcepos()
     )
 
 
 @pg.production('stmt : READ PAREN_L ID PAREN_R')
 def read_statement(p):
     assert p[2].gettokentype() == "ID"
-    return ast.ReadStatement(ast.IdentifierReference(p[2].getstr()))
+    return ast.ReadStatement(
+        ast.IdentifierReference(p[2].getstr(), p[2].getsourcepos()),
+        p[0].getsourcepos()
+    )
 
 
 @pg.production('stmt : ID ASSIGN exp')
 def assign(p):
     assert p[0].gettokentype() == "ID"
-    return ast.Assignment(ast.IdentifierReference(p[0].getstr()), p[2])
+    source_pos = p[0].getsourcepos()
+    return ast.Assignment(ast.IdentifierReference(p[0].getstr(), source_pos),
+                          p[2], source_pos)
 
 
 # Control statements
 @pg.production('stmt : WHILE exp DO stmtlst ENDWHILE')
 def loop(p):
-    return ast.WhileStatement(p[1], p[3])
+    return ast.WhileStatement(p[1], p[3], p[0].getsourcepos())
 
 
 @pg.production('stmt : IF exp THEN stmtlst ELSE stmtlst ENDIF')
 def stmt_elif(p):
-    return ast.IfStatement(p[1], p[3], p[5])
+    return ast.IfStatement(p[1], p[3], p[5], p[0].getsourcepos())
 
 
 @pg.production('stmt : IF exp THEN stmtlst ENDIF')
 def stmt_if(p):
-    return ast.IfStatement(p[1], p[3], None)
+    return ast.IfStatement(p[1], p[3], None, p[0].getsourcepos())
 
 
 # Expression evaluation
@@ -121,37 +132,38 @@ def stmt_if(p):
 @pg.production('exp : exp ANGLE_R exp')
 def exp_binary_term(p):
     token_type, left, right = p[1].gettokentype(), p[0], p[2]
+    source_pos = p[1].getsourcepos()
     if token_type == "PLUS":
-        return ast.Add(left, right)
+        return ast.Add(left, right, source_pos)
     elif token_type == "MINUS":
-        return ast.Subtract(left, right)
+        return ast.Subtract(left, right, source_pos)
     elif token_type == "ASTERISK":
-        return ast.Multiply(left, right)
+        return ast.Multiply(left, right, source_pos)
     elif token_type == "DIVIDE":
-        return ast.Divide(left, right)
+        return ast.Divide(left, right, source_pos)
     elif token_type == "PERCENT":
-        return ast.Modulo(left, right)
+        return ast.Modulo(left, right, source_pos)
     elif token_type == "EQUAL":
-        return ast.EqualTo(left, right)
+        return ast.EqualTo(left, right, source_pos)
     elif token_type == "ANGLE_R":
-        return ast.GreaterThan(left, right)
+        return ast.GreaterThan(left, right, source_pos)
     else:
         assert False, "Shouldn't be here"
 
 
 @pg.production('exp : NUM')
 def factor_num(p):
-    return ast.Number(int(p[0].getstr()))
+    return ast.Number(int(p[0].getstr()), p[0].getsourcepos())
 
 
 @pg.production('exp : MINUS NUM')
 def factor_negative_num(p):
-    return ast.Number(-int(p[1].getstr()))
+    return ast.Number(-int(p[1].getstr()), p[0].getsourcepos())
 
 
 @pg.production('exp : ID')
 def factor_id(p):
-    return ast.IdentifierReference(p[0].getstr())
+    return ast.IdentifierReference(p[0].getstr(), p[0].getsourcepos())
 
 
 @pg.production('exp : PAREN_L exp PAREN_R')
@@ -161,10 +173,90 @@ def factor_parens(p):
 
 parser = pg.build()
 
+
+def parse(tokens, validate=True):
+    """Parse `tokens`, running the field validators of each new node unless
+    `validate` is false.
+
+    Skipping them uses attrs' process-wide switch while the parse runs, so a
+    parse with `validate` false is not thread-safe: attrs objects that other
+    threads build meanwhile skip their validators too. `ast.validate` checks
+    such a tree afterwards.
+    """
+    if validate:
+        return parser.parse(tokens)
+    run_validators = attr.get_run_validators()
+    attr.set_run_validators(False)
+    try:
+        return parser.parse(tokens)
+    finally:
+        attr.set_run_validators(run_validators)
+
+
 if __name__ == "__main__":
+    import argparse
+    import sys
     from pprint import pprint
-    from sys import argv
-    with open(argv[1], "r") as f:
-        p = parser.parse(lex(f.read()))
-    pprint(p.__dict__)
-    pprint(p.eval({}))
+
+    import cache
+    import optimizer
+    import profiler
+    import scanner
+    import tracing
+
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument("filename")
+    argparser.add_argument("--engine", choices=["tree", "vm", "python"],
+                           default="tree")
+    argparser.add_argument("--optimize", action="store_true")
+    argparser.add_argument("--no-validate", dest="validate",
+                           action="store_false")
+    argparser.add_argument("--trace", choices=sorted(tracing.levels),
+                           default="off")
+    argparser.add_argument("--trace-file", type=argparse.FileType("w"),
+                           default=sys.stderr)
+    argparser.add_argument("--trace-every", type=int, default=1)
+    argparser.add_argument("--profile", action="store_true")
+    argparser.add_argument("--profile-json", type=argparse.FileType("w"))
+    argparser.add_argument("--cache", metavar="DIRECTORY")
+    argparser.add_argument("--cache-size", type=int,
+                           default=cache.DEFAULT_MAX_BYTES)
+    args = argparser.parse_args()
+    program = None
+    if args.cache is not None:
+        programs = cache.ProgramCache(args.cache, args.cache_size)
+        with open(args.filename, "r") as f:
+            source = f.read()
+        key = programs.key(source, args.engine, args.optimize)
+        program = programs.get(key)
+    if program is None:
+        if args.cache is not None:
+            p = parse(scanner.scan(source), validate=args.validate)
+        else:
+            with open(args.filename, "r") as f:
+                p = parse(scanner.scan_stream(f), validate=args.validate)
+        if args.optimize:
+            p, eliminated = optimizer.optimize(p)
+            sys.stderr.write("Optimizer eliminated %d nodes\n" % eliminated)
+        if tracing.enable(args.trace, args.trace_file, args.trace_every):
+            pprint(attr.asdict(p, recurse=False), stream=args.trace_file)
+        program = cache.engines[args.engine](p)
+        # Cached programs must have been validated, since a hit is not.
+        if args.cache is not None and args.validate:
+            programs.put(key, program)
+    else:
+        tracing.enable(args.trace, args.trace_file, args.trace_every)
+    if args.cache is not None:
+        sys.stderr.write("Cache: %(hits)d hits, %(misses)d misses, "
+                         "%(entries)d entries\n" % programs.stats())
+    if args.engine != "tree":
+        pprint(program.run({}))
+    elif args.profile or args.profile_json:
+        profile = profiler.Profiler()
+        pprint(profile.run(program, {}))
+        if args.profile:
+            sys.stderr.write(profile.report())
+        if args.profile_json:
+            profile.write_json(args.profile_json)
+    else:
+        pprint(program.eval({}))
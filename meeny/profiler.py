@@ -0,0 +1,169 @@
+"""Opt-in profiling of the tree walker.
+
+`Profiler.run` evaluates a program with the `eval` of every node class
+wrapped (see `instrument`), counting the evaluations of each node and the
+time spent in them, both in total and in the node itself, excluding its
+children. Counts and times are gathered per node type and per source
+location, the position of the token a node was parsed from. The conditions
+of loops and `if` statements are watched too: for every `while`, how often it
+was entered and how many iterations it ran; for every `if`, how often its
+`then` branch was taken.
+
+Times include the profiler's own bookkeeping, so they are only meaningful
+relative to each other. Nothing is wrapped outside of `Profiler.run`, so
+evaluation costs nothing extra when not profiling.
+"""
+import json
+import timeit
+
+import ast
+import instrument
+
+
+def location(node):
+    """The `(line, column)` a node was parsed from, or None."""
+    source_pos = node.source_pos
+    if source_pos is None:
+        return None
+    return source_pos.lineno, source_pos.colno
+
+
+def format_location(key):
+    return "?" if key is None else "%d:%d" % key
+
+
+class Profiler(object):
+    def __init__(self, timer=timeit.default_timer):
+        self.timer = timer
+        # [count, total time, own time] by node type name, and by location
+        # and node type name.
+        self.types = {}
+        self.locations = {}
+        # [entries, iterations] of each loop and [evaluations, taken] of each
+        # `if`, by location.
+        self.loops = {}
+        self.branches = {}
+        # [node, time spent in its children] for every running evaluation.
+        self.stack = []
+
+    def wrap(self, original):
+        profiler = self
+        timer = self.timer
+        stack = self.stack
+
+        def eval(node, context):
+            running = [node, 0.0]
+            stack.append(running)
+            start = timer()
+            try:
+                result = original(node, context)
+            finally:
+                elapsed = timer() - start
+                stack.pop()
+                if stack:
+                    stack[-1][1] += elapsed
+                profiler.record(node, elapsed, elapsed - running[1])
+            if stack:
+                parent = stack[-1][0]
+                if (type(parent) in (ast.WhileStatement, ast.IfStatement) and
+                        parent.condition is node):
+                    profiler.record_condition(parent, result)
+            return result
+        return eval
+
+    def record(self, node, total, own):
+        name = type(node).__name__
+        key = location(node)
+        for stats in (self.types.setdefault(name, [0, 0.0, 0.0]),
+                      self.locations.setdefault((key, name), [0, 0.0, 0.0])):
+            stats[0] += 1
+            stats[1] += total
+            stats[2] += own
+        if isinstance(node, ast.WhileStatement):
+            self.loops.setdefault(key, [0, 0])[0] += 1
+
+    def record_condition(self, node, value):
+        key = location(node)
+        if isinstance(node, ast.WhileStatement):
+            if value:
+                self.loops.setdefault(key, [0, 0])[1] += 1
+        else:
+            stats = self.branches.setdefault(key, [0, 0])
+            stats[0] += 1
+            if value:
+                stats[1] += 1
+
+    def run(self, program, context):
+        """Evaluate `program` while profiling and return its result."""
+        with instrument.wrapped_eval(self.wrap):
+            return program.eval(context)
+
+    def report(self):
+        """A text report, hottest nodes first by the time spent in them."""
+        lines = ["%-24s %10s %12s %12s" % ("node type", "count", "total ms",
+                                           "own ms")]
+        for name, (count, total, own) in sorted(
+                self.types.items(), key=lambda item: -item[1][2]):
+            lines.append("%-24s %10d %12.3f %12.3f" % (
+                name, count, total * 1000, own * 1000))
+        lines.append("")
+        lines.append("%-10s %-24s %10s %12s %12s" % (
+            "location", "node type", "count", "total ms", "own ms"))
+        for (key, name), (count, total, own) in sorted(
+                self.locations.items(), key=lambda item: -item[1][2]):
+            lines.append("%-10s %-24s %10d %12.3f %12.3f" % (
+                format_location(key), name, count, total * 1000, own * 1000))
+        if self.loops:
+            lines.append("")
+            lines.append("%-10s %10s %12s %14s" % (
+                "loop", "entries", "iterations", "per entry"))
+            for key, (entries, iterations) in sorted(
+                    self.loops.items(), key=lambda item: -item[1][1]):
+                lines.append("%-10s %10d %12d %14.1f" % (
+                    format_location(key), entries, iterations,
+                    float(iterations) / entries if entries else 0.0))
+        if self.branches:
+            lines.append("")
+            lines.append("%-10s %12s %10s %8s" % (
+                "if", "evaluations", "taken", "ratio"))
+            for key, (evaluations, taken) in sorted(
+                    self.branches.items(), key=lambda item: -item[1][0]):
+                lines.append("%-10s %12d %10d %7.1f%%" % (
+                    format_location(key), evaluations, taken,
+                    100.0 * taken / evaluations))
+        return "\n".join(lines) + "\n"
+
+    def as_dict(self):
+        """The profile as JSON-compatible data; times are in seconds."""
+        def position(key):
+            if key is None:
+                return {"line": None, "column": None}
+            return {"line": key[0], "column": key[1]}
+
+        return {
+            "node_types": [
+                {"node": name, "count": count, "total": total, "own": own}
+                for name, (count, total, own) in sorted(self.types.items())
+            ],
+            "locations": [
+                dict(position(key), node=name, count=count, total=total,
+                     own=own)
+                for (key, name), (count, total, own) in sorted(
+                    self.locations.items(), key=lambda item: (
+                        item[0][0] or (0, 0), item[0][1]))
+            ],
+            "loops": [
+                dict(position(key), entries=entries, iterations=iterations)
+                for key, (entries, iterations) in sorted(
+                    self.loops.items(), key=lambda item: item[0] or (0, 0))
+            ],
+            "branches": [
+                dict(position(key), evaluations=evaluations, taken=taken)
+                for key, (evaluations, taken) in sorted(
+                    self.branches.items(), key=lambda item: item[0] or (0, 0))
+            ],
+        }
+
+    def write_json(self, f):
+        json.dump(self.as_dict(), f, indent=2, sort_keys=True)
+        f.write("\n")
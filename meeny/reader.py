@@ -0,0 +1,48 @@
+"""Where `read` statements get their values from.
+
+Every evaluator asks `source` for the next value, passing the prompt. The
+default `Console` flushes the output sink, prompts and reads a line from
+standard input. `redirect` swaps the active source, for example for `Inputs`,
+which hands out a fixed list of values without prompting.
+"""
+import output
+
+
+try:
+    raw_input
+except NameError:
+    raw_input = input
+
+
+class InputError(Exception):
+    pass
+
+
+class Console(object):
+    def read(self, prompt):
+        output.sink.flush()
+        return raw_input(prompt)
+
+
+class Inputs(object):
+    def __init__(self, values):
+        self.values = list(values)
+        self.position = 0
+
+    def read(self, prompt):
+        if self.position >= len(self.values):
+            raise InputError("No input left for %r" % prompt)
+        value = self.values[self.position]
+        self.position += 1
+        return value
+
+
+source = Console()
+
+
+def redirect(new_source=None):
+    """Replace the active source, `Console` by default; returns the old one."""
+    global source
+    previous = source
+    source = new_source if new_source is not None else Console()
+    return previous
@@ -0,0 +1,329 @@
+"""Serve meeny program runs over a Unix or TCP socket with asyncio.
+
+Run with `python3 server.py --unix PATH` or `--tcp HOST:PORT`; the server
+needs Python 3.7 or later. Every message in either direction is a frame: a
+four-byte big-endian length and that many bytes of UTF-8 JSON. A request is
+an object with the program's `source` and optionally its `inputs`, a list of
+values for its `read` statements, a positive `timeout` in seconds and an
+`id`, which the response repeats. A response holds the program's `output`,
+an `error` (null after a successful run), whether the compiled program was
+`cached`, and `timings`: `compile` (on a cache miss), `run` and `total`,
+which also counts the time spent waiting for a worker. Every request gets a
+response, with an error for malformed ones.
+
+Requests on one connection may be pipelined; responses come back as runs
+finish, so match them by `id`. Runs happen in a pool of worker processes,
+each of which keeps the programs it compiled in an LRU cache keyed by the
+SHA-256 of their source. No more than `--max-pending` requests are in
+progress at once; past that the server stops reading from its connections,
+and clients are held back by their full sockets. Each run gets the smaller of
+its own timeout and `--timeout`, enforced with `SIGALRM` in the worker. On
+SIGINT or SIGTERM the server stops accepting connections, finishes the runs
+in progress and exits.
+
+`Client` speaks the protocol for load generators and tests.
+"""
+import asyncio
+import collections
+import concurrent.futures
+import hashlib
+import json
+import os
+import signal
+import struct
+import sys
+import timeit
+
+import batch
+import embed
+
+HEADER = struct.Struct(">I")
+
+MAX_FRAME = 16 * 1024 * 1024
+
+DEFAULT_TIMEOUT = 10.0
+
+# How long past its timeout a run may take to come back from its worker.
+GRACE = 1.0
+
+DEFAULT_CACHE_SIZE = 256
+
+
+class ProtocolError(Exception):
+    pass
+
+
+async def read_frame(reader):
+    """The next message from `reader`, or None at the end of the stream."""
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise ProtocolError("Truncated frame header")
+        return None
+    size, = HEADER.unpack(header)
+    if size > MAX_FRAME:
+        raise ProtocolError("Frame of %d bytes is too large" % size)
+    try:
+        data = await reader.readexactly(size)
+    except asyncio.IncompleteReadError:
+        raise ProtocolError("Truncated frame")
+    try:
+        return json.loads(data.decode("utf-8"))
+    except ValueError as e:
+        raise ProtocolError("Malformed frame: %s" % e)
+
+
+def write_frame(writer, message):
+    data = json.dumps(message).encode("utf-8")
+    writer.write(HEADER.pack(len(data)) + data)
+
+
+# The state of a worker process.
+programs = collections.OrderedDict()
+settings = {}
+
+
+def init_worker(engine, cache_size):
+    settings["engine"] = engine
+    settings["cache_size"] = cache_size
+    signal.signal(signal.SIGALRM, batch.alarm)
+    # Shutting down is up to the server.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def execute(source, inputs, timeout):
+    """Compile `source` unless cached and run it; runs in a worker."""
+    timer = timeit.default_timer
+    key = hashlib.sha256(source.encode("utf-8")).hexdigest()
+    timings = {}
+    result = {"output": None, "error": None, "cached": key in programs,
+              "timings": timings}
+    try:
+        try:
+            if timeout:
+                signal.setitimer(signal.ITIMER_REAL, timeout)
+            executable = programs.get(key)
+            if executable is None:
+                start = timer()
+                executable = embed.compile(source, settings["engine"])
+                timings["compile"] = timer() - start
+                programs[key] = executable
+                if len(programs) > settings["cache_size"]:
+                    programs.popitem(last=False)
+            else:
+                programs.move_to_end(key)
+            start = timer()
+            result["output"] = executable.run(inputs)
+            timings["run"] = timer() - start
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    except batch.Timeout:
+        result["error"] = "Timed out after %gs" % timeout
+    except Exception as e:
+        result["error"] = batch.describe(e)
+    return result
+
+
+class Server(object):
+    def __init__(self, jobs=None, max_pending=64, timeout=DEFAULT_TIMEOUT,
+                 engine="tree", cache_size=DEFAULT_CACHE_SIZE):
+        self.jobs = jobs
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.engine = engine
+        self.cache_size = cache_size
+        self.executor = None
+        self.pending = None
+        self.closing = False
+        # Connection handlers and the runs in progress.
+        self.connections = set()
+        self.runs = set()
+        self.requests = 0
+        self.errors = 0
+
+    async def handle(self, reader, writer):
+        connection = asyncio.current_task()
+        self.connections.add(connection)
+        runs = set()
+        try:
+            while not self.closing:
+                request = await read_frame(reader)
+                if request is None:
+                    break
+                await self.pending.acquire()
+                run = asyncio.ensure_future(self.respond(request, writer))
+                for tasks in (runs, self.runs):
+                    tasks.add(run)
+                    run.add_done_callback(tasks.discard)
+        except ProtocolError as e:
+            write_frame(writer, {"id": None, "error": "Protocol error: %s" % e})
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.connections.discard(connection)
+            if runs:
+                await asyncio.wait(runs)
+            writer.close()
+
+    async def respond(self, request, writer):
+        start = timeit.default_timer()
+        try:
+            result = await self.run(request)
+        except Exception as e:
+            # Whatever goes wrong, the client still gets its response.
+            result = {"output": None, "cached": False, "timings": {},
+                      "error": "Server error: %s" % batch.describe(e)}
+        finally:
+            self.pending.release()
+        result["timings"]["total"] = timeit.default_timer() - start
+        result["id"] = request.get("id") if isinstance(request, dict) else None
+        self.requests += 1
+        self.errors += result["error"] is not None
+        try:
+            write_frame(writer, result)
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def run(self, request):
+        failed = {"output": None, "cached": False, "timings": {}}
+        if not isinstance(request, dict) or not isinstance(
+                request.get("source"), str):
+            return dict(failed, error="Bad request: no source")
+        inputs = request.get("inputs", [])
+        if not isinstance(inputs, list):
+            return dict(failed, error="Bad request: inputs is not a list")
+        timeout = request.get("timeout")
+        if timeout is None:
+            timeout = self.timeout
+        elif (isinstance(timeout, bool) or
+                not isinstance(timeout, (int, float)) or
+                not 0 < timeout < float("inf")):
+            return dict(failed,
+                        error="Bad request: timeout is not a positive number")
+        elif self.timeout:
+            timeout = min(timeout, self.timeout)
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, execute,
+                                      request["source"], inputs, timeout)
+        try:
+            return await asyncio.wait_for(
+                future, timeout + GRACE if timeout else None)
+        except asyncio.TimeoutError:
+            return dict(failed, error="Timed out after %gs" % timeout)
+        except concurrent.futures.process.BrokenProcessPool as e:
+            return dict(failed, error="Worker failed: %s" % e)
+
+    async def serve(self, unix=None, host=None, port=None):
+        """Serve until SIGINT or SIGTERM, then shut down gracefully."""
+        loop = asyncio.get_running_loop()
+        self.pending = asyncio.Semaphore(self.max_pending)
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            self.jobs, initializer=init_worker,
+            initargs=(self.engine, self.cache_size))
+        if unix is not None:
+            if os.path.exists(unix):
+                os.remove(unix)
+            server = await asyncio.start_unix_server(self.handle, unix)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        stop = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        try:
+            await stop.wait()
+        finally:
+            self.closing = True
+            server.close()
+            if self.runs:
+                await asyncio.wait(self.runs)
+            # Whatever connections are left are waiting for a request.
+            for connection in list(self.connections):
+                connection.cancel()
+            await server.wait_closed()
+            self.executor.shutdown(wait=True)
+            if unix is not None and os.path.exists(unix):
+                os.remove(unix)
+        sys.stderr.write("Served %d requests, %d with errors\n" % (
+            self.requests, self.errors))
+
+
+class Client(object):
+    """One connection to a server, with requests pipelined over it."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.waiting = {}
+        self.next_id = 0
+        self.receiver = asyncio.ensure_future(self.receive())
+
+    @classmethod
+    async def connect(cls, unix=None, host=None, port=None):
+        if unix is not None:
+            reader, writer = await asyncio.open_unix_connection(unix)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def receive(self):
+        try:
+            while True:
+                response = await read_frame(self.reader)
+                if response is None:
+                    break
+                future = self.waiting.pop(response.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        finally:
+            for future in self.waiting.values():
+                if not future.done():
+                    future.set_exception(
+                        ConnectionError("Connection to server lost"))
+
+    async def run(self, source, inputs=(), timeout=None):
+        """Run `source` on the server and return the response."""
+        self.next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[self.next_id] = future
+        request = {"id": self.next_id, "source": source,
+                   "inputs": list(inputs)}
+        if timeout is not None:
+            request["timeout"] = timeout
+        write_frame(self.writer, request)
+        await self.writer.drain()
+        return await future
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.receiver
+        except (ConnectionError, ProtocolError):
+            pass
+
+
+def parse_address(address):
+    host, _, port = address.rpartition(":")
+    return host or None, int(port)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    argparser = argparse.ArgumentParser()
+    group = argparser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--unix", metavar="PATH")
+    group.add_argument("--tcp", metavar="HOST:PORT", type=parse_address)
+    argparser.add_argument("--jobs", type=int)
+    argparser.add_argument("--max-pending", type=int, default=64)
+    argparser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    argparser.add_argument("--cache-size", type=int,
+                           default=DEFAULT_CACHE_SIZE)
+    argparser.add_argument("--engine", choices=["tree", "vm", "python"],
+                           default="tree")
+    args = argparser.parse_args()
+    server = Server(args.jobs, args.max_pending, args.timeout, args.engine,
+                    args.cache_size)
+    host, port = args.tcp if args.tcp else (None, None)
+    asyncio.run(server.serve(args.unix, host, port))
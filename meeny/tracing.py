@@ -0,0 +1,92 @@
+"""Execution tracing for the tree walker.
+
+Tracing is off unless `enable` installs a `Tracer`. At the `STATEMENTS` level
+it reports every top-level statement before it runs; at `NODES` it reports
+every node evaluation, indented by nesting depth. `every` keeps only one event
+out of that many. Events go to `sys.stderr` by default, to any object with a
+`write` method, or to a callable, which receives the node and its depth.
+
+`Program.eval` looks at `tracer` once per run, and per-node hooks are only
+installed while a `NODES` trace is running, so evaluation costs nothing extra
+while tracing is off.
+"""
+import sys
+
+import instrument
+
+
+OFF, STATEMENTS, NODES = range(3)
+
+levels = {"off": OFF, "statements": STATEMENTS, "nodes": NODES}
+
+
+def describe(node):
+    """A one-line summary of a node that does not include its children."""
+    fields = []
+    for name in ("name", "slot", "value", "newline"):
+        value = getattr(node, name, None)
+        if isinstance(value, (int, str)):
+            fields.append("%s=%r" % (name, value))
+    return "%s(%s)" % (type(node).__name__, ", ".join(fields))
+
+
+class Tracer(object):
+    def __init__(self, level=STATEMENTS, sink=None, every=1):
+        self.level = levels.get(level, level)
+        self.sink = sink
+        self.every = every
+        self.events = 0
+        self.depth = 0
+
+    def event(self, node):
+        self.events += 1
+        if self.events % self.every:
+            return
+        sink = self.sink if self.sink is not None else sys.stderr
+        if hasattr(sink, "write"):
+            if self.level >= NODES:
+                sink.write("%s%s\n" % ("  " * self.depth, describe(node)))
+            else:
+                sink.write("%s\n" % (node,))
+        else:
+            sink(node, self.depth)
+
+    def wrap(self, original):
+        tracer = self
+
+        def eval(node, context):
+            tracer.event(node)
+            tracer.depth += 1
+            try:
+                return original(node, context)
+            finally:
+                tracer.depth -= 1
+        return eval
+
+    def run(self, statements, context):
+        if self.level >= NODES:
+            with instrument.wrapped_eval(self.wrap):
+                for statement in statements:
+                    statement.eval(context)
+        else:
+            for statement in statements:
+                if self.level >= STATEMENTS:
+                    self.event(statement)
+                statement.eval(context)
+
+
+tracer = None
+
+
+def enable(level=STATEMENTS, sink=None, every=1):
+    """Install and return a tracer used by every following program run."""
+    global tracer
+    tracer = Tracer(level, sink, every)
+    if tracer.level == OFF:
+        tracer = None
+    return tracer
+
+
+def disable():
+    global tracer
+    tracer = None
@@ -0,0 +1,188 @@
+"""Translate meeny programs into Python functions.
+
+`compile_program` writes a parsed `ast.Program` out as the source of a Python
+function, compiles it with the built-in `compile` and returns a `PythonCode`
+whose `run` behaves like `ast.Program.eval`. Declared variables become locals
+of the function (prefixed with `v_` so that they cannot collide with Python
+keywords or helper names), loops and conditionals become native `while` and
+`if` statements, and operators are written inline, so CPython's own
+interpreter loop does the work.
+
+The program is generated as text rather than as a Python `ast.Module`
+because this directory's `ast` module shadows the standard library one.
+"""
+import attr
+
+import ast
+import output
+import reader
+
+
+operators = {
+    ast.Add: "+",
+    ast.Subtract: "-",
+    ast.Multiply: "*",
+    ast.Divide: "//",
+    ast.Modulo: "%",
+    ast.GreaterThan: ">",
+    ast.EqualTo: "==",
+}
+
+# CPython's parser gives up on deeply nested parentheses, so expressions
+# nested deeper than this are computed through temporaries instead.
+MAX_NESTING = 50
+
+
+@attr.s
+class PythonCode(object):
+    name = attr.ib()
+    source = attr.ib(repr=False)
+    function = attr.ib(repr=False)
+
+    def __reduce__(self):
+        # Functions do not pickle; compile the source again instead.
+        return load_source, (self.name, self.source)
+
+    def run(self, context):
+        sink = output.sink
+        try:
+            self.function(context, sink.write, reader.source.read)
+        finally:
+            sink.flush()
+
+
+class Translator(object):
+    def __init__(self, program):
+        self.program = program
+        self.lines = []
+        self.declared = set(identifier.name for identifier in program.decls)
+        self.temporaries = 0
+
+    def emit(self, indent, line):
+        self.lines.append("    " * indent + line)
+
+    def variable(self, name):
+        assert name in self.declared, "Undeclared identifier %s" % name
+        return "v_" + name
+
+    def temporary(self):
+        self.temporaries += 1
+        return "t_%d" % self.temporaries
+
+    def translate(self):
+        program = self.program
+        self.emit(0, "def program(context, write, read):")
+        for identifier in program.decls:
+            self.emit(1, "%s = %r" % (self.variable(identifier.name),
+                                      identifier.value))
+        self.statements(program.body, 1)
+        names = []
+        for identifier in program.decls:
+            if identifier.name not in names:
+                names.append(identifier.name)
+        for name in names:
+            self.emit(1, "context[%r] = %s" % (name, self.variable(name)))
+        for identifier in program.decls:
+            self.emit(1, "if %s is None:" % self.variable(identifier.name))
+            self.emit(2, "write(%r)" % (
+                "Warning: identifier %s not used.\n" % identifier.name))
+        return "\n".join(self.lines) + "\n"
+
+    def statements(self, statements, indent):
+        if not statements:
+            self.emit(indent, "pass")
+        for statement in statements or ():
+            self.statement(statement, indent)
+
+    def statement(self, node, indent):
+        if isinstance(node, ast.Assignment):
+            value = self.expression(node.value, indent)
+            self.emit(indent, "%s = %s" % (
+                self.variable(node.identifier.name), value))
+        elif isinstance(node, ast.ReadStatement):
+            self.emit(indent, "%s = int(read(%r))" % (
+                self.variable(node.target.name),
+                "Value for %s: " % node.target.name))
+        elif isinstance(node, ast.WriteStatement):
+            end = "\n" if node.newline else ""
+            if not node.value:
+                self.emit(indent, "write(%r)" % end)
+            elif end:
+                value = self.expression(node.value, indent)
+                self.emit(indent, "write(str(%s) + %r)" % (value, end))
+            else:
+                value = self.expression(node.value, indent)
+                self.emit(indent, "write(str(%s))" % value)
+        elif isinstance(node, ast.WhileStatement):
+            mark = len(self.lines)
+            condition = self.expression(node.condition, indent + 1)
+            if len(self.lines) == mark:
+                self.emit(indent, "while %s:" % condition)
+            else:
+                # The condition needed temporaries; recompute them on every
+                # test by moving them inside an unconditional loop.
+                prelude = self.lines[mark:]
+                del self.lines[mark:]
+                self.emit(indent, "while True:")
+                self.lines.extend(prelude)
+                self.emit(indent + 1, "if not %s:" % condition)
+                self.emit(indent + 2, "break")
+            self.statements(node.body, indent + 1)
+        elif isinstance(node, ast.IfStatement):
+            condition = self.expression(node.condition, indent)
+            self.emit(indent, "if %s:" % condition)
+            self.statements(node.body, indent + 1)
+            if node.else_body:
+                self.emit(indent, "else:")
+                self.statements(node.else_body, indent + 1)
+        else:
+            raise NotImplementedError(node.__class__)
+
+    def expression(self, node, indent):
+        """Return Python source for `node`.
+
+        Expressions nested too deeply for CPython's parser are first broken
+        up into temporaries, emitted at `indent` in evaluation order before
+        the statement that uses the result.
+        """
+        if depth(node) > MAX_NESTING:
+            return self.linearize(node, indent)
+        return self.inline(node)
+
+    def inline(self, node):
+        if isinstance(node, ast.Number):
+            return "(%d)" % node.value
+        elif isinstance(node, ast.IdentifierReference):
+            return self.variable(node.name)
+        elif type(node) in operators:
+            return "(%s %s %s)" % (self.inline(node.left),
+                                   operators[type(node)],
+                                   self.inline(node.right))
+        raise NotImplementedError(node.__class__)
+
+    def linearize(self, node, indent):
+        if not isinstance(node, ast.BinaryOperation):
+            return self.inline(node)
+        left = self.linearize(node.left, indent)
+        right = self.linearize(node.right, indent)
+        temporary = self.temporary()
+        self.emit(indent, "%s = %s %s %s" % (
+            temporary, left, operators[type(node)], right))
+        return temporary
+
+
+def depth(node):
+    if isinstance(node, ast.BinaryOperation):
+        return 1 + max(depth(node.left), depth(node.right))
+    return 0
+
+
+def load_source(name, source):
+    namespace = {}
+    code = compile(source, "<meeny program %s>" % name, "exec")
+    exec(code, namespace)
+    return PythonCode(name, source, namespace["program"])
+
+
+def compile_program(program):
+    return load_source(program.name, Translator(program).translate())
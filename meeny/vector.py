@@ -0,0 +1,236 @@
+"""Evaluate one meeny program over many input vectors at once with NumPy.
+
+`compile` prepares a program whose `run` takes a matrix with one row of
+inputs per lane and returns the output of every lane, exactly as
+`embed.Executable.run` gives it for that row. Each variable is a column of
+int64 values, one per lane, and each statement runs once for all the lanes
+that reach it: `read` takes every lane's next input from its row, arithmetic
+runs as array operations, and `if` and `while` narrow a mask of active
+lanes, a loop repeating until none of its lanes continue.
+
+A lane is dropped from the vector run as soon as it does something int64
+columns cannot follow: an overflow, a division by zero, a use of an unset
+variable or a `read` past the end of its row. Dropped lanes are run again on
+their own by the scalar tree walker, as are all lanes if NumPy is missing. A
+lane whose scalar run raises gets the exception in place of its output.
+"""
+import ast
+import cache
+import embed
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+
+
+def fits_int64(node):
+    """Whether every constant in `node`, a list or a node, is an int64."""
+    if node is None:
+        return True
+    elif isinstance(node, list):
+        return all(fits_int64(child) for child in node)
+    elif isinstance(node, ast.Number):
+        return INT64_MIN <= node.value <= INT64_MAX
+    elif isinstance(node, ast.BinaryOperation):
+        return fits_int64(node.left) and fits_int64(node.right)
+    elif isinstance(node, (ast.SlotAssignment, ast.WriteStatement)):
+        return fits_int64(node.value)
+    elif isinstance(node, ast.WhileStatement):
+        return fits_int64(node.condition) and fits_int64(node.body)
+    elif isinstance(node, ast.IfStatement):
+        return (fits_int64(node.condition) and fits_int64(node.body) and
+                fits_int64(node.else_body))
+    return True
+
+
+class VectorRun(object):
+    """The columns of one vector run of a resolved program."""
+
+    def __init__(self, program, inputs):
+        self.program = program
+        self.inputs = inputs
+        lanes = inputs.shape[0]
+        shape = (len(program.names), lanes)
+        self.values = numpy.zeros(shape, dtype=numpy.int64)
+        self.booleans = numpy.zeros(shape, dtype=bool)
+        self.defined = numpy.zeros(shape, dtype=bool)
+        self.cursor = numpy.zeros(lanes, dtype=numpy.intp)
+        self.failed = numpy.zeros(lanes, dtype=bool)
+        # (lanes, values, booleans, newline) of every write, in order.
+        self.writes = []
+        slots = dict((name, slot) for slot, name in enumerate(program.names))
+        for identifier in program.decls:
+            if identifier.value is not None:
+                slot = slots[identifier.name]
+                self.values[slot] = identifier.value
+                self.defined[slot] = True
+
+    def fail(self, lanes):
+        self.failed |= lanes
+
+    def live(self, mask):
+        return mask & ~self.failed
+
+    def statements(self, statements, mask):
+        for statement in statements or ():
+            mask = self.live(mask)
+            if not mask.any():
+                return
+            self.statement(statement, mask)
+
+    def statement(self, node, mask):
+        if isinstance(node, ast.SlotAssignment):
+            values, booleans = self.expression(node.value, mask)
+            mask = self.live(mask)
+            slot = node.target.slot
+            numpy.copyto(self.values[slot], values, where=mask)
+            numpy.copyto(self.booleans[slot], booleans, where=mask)
+            self.defined[slot] |= mask
+        elif isinstance(node, ast.SlotReadStatement):
+            exhausted = mask & (self.cursor >= self.inputs.shape[1])
+            self.fail(exhausted)
+            lanes = numpy.nonzero(mask & ~exhausted)[0]
+            slot = node.target.slot
+            self.values[slot, lanes] = self.inputs[lanes, self.cursor[lanes]]
+            self.booleans[slot, lanes] = False
+            self.defined[slot, lanes] = True
+            self.cursor[lanes] += 1
+        elif isinstance(node, ast.WriteStatement):
+            if node.value:
+                values, booleans = self.expression(node.value, mask)
+                lanes = numpy.nonzero(self.live(mask))[0]
+                if not isinstance(booleans, bool):
+                    booleans = booleans[lanes]
+                self.writes.append((lanes, values[lanes], booleans,
+                                    node.newline))
+            else:
+                self.writes.append((numpy.nonzero(mask)[0], None, False,
+                                    node.newline))
+        elif isinstance(node, ast.WhileStatement):
+            mask = mask.copy()
+            while True:
+                condition, _ = self.expression(node.condition, mask)
+                mask &= ~self.failed & (condition != 0)
+                if not mask.any():
+                    break
+                self.statements(node.body, mask)
+                mask &= ~self.failed
+        elif isinstance(node, ast.IfStatement):
+            condition, _ = self.expression(node.condition, mask)
+            mask = self.live(mask)
+            taken = mask & (condition != 0)
+            other = mask & ~taken
+            if taken.any():
+                self.statements(node.body, taken)
+            if node.else_body and other.any():
+                self.statements(node.else_body, other)
+        else:
+            raise NotImplementedError(node.__class__)
+
+    def expression(self, node, mask):
+        """The int64 `values` of `node` in every lane, and `booleans`: True,
+        False or an array saying which values are comparison results."""
+        if isinstance(node, ast.Number):
+            return numpy.full(mask.shape, node.value, numpy.int64), False
+        elif isinstance(node, ast.SlotReference):
+            self.fail(mask & ~self.defined[node.slot])
+            return self.values[node.slot], self.booleans[node.slot]
+        elif isinstance(node, ast.BinaryOperation):
+            left, _ = self.expression(node.left, mask)
+            right, _ = self.expression(node.right, mask)
+            with numpy.errstate(all="ignore"):
+                result, failed = self.binary(type(node), left, right)
+            if failed is not None:
+                self.fail(mask & failed)
+            return result, type(node) in (ast.GreaterThan, ast.EqualTo)
+        raise NotImplementedError(node.__class__)
+
+    def binary(self, kind, a, b):
+        """The result of an operator and the lanes it overflowed in."""
+        if kind is ast.Add:
+            result = a + b
+            return result, ((a ^ result) & (b ^ result)) < 0
+        elif kind is ast.Subtract:
+            result = a - b
+            return result, ((a ^ b) & (a ^ result)) < 0
+        elif kind is ast.Multiply:
+            result = a * b
+            nonzero = a != 0
+            quotient = result // numpy.where(nonzero, a, 1)
+            return result, nonzero & (
+                (quotient != b) | ((a == -1) & (b == INT64_MIN)))
+        elif kind is ast.Divide:
+            failed = (b == 0) | ((a == INT64_MIN) & (b == -1))
+            return a // numpy.where(failed, 1, b), failed
+        elif kind is ast.Modulo:
+            # Any number modulo -1 is 0, as it is modulo 1.
+            failed = b == 0
+            return a % numpy.where(failed | (b == -1), 1, b), failed
+        elif kind is ast.GreaterThan:
+            return (a > b).astype(numpy.int64), None
+        elif kind is ast.EqualTo:
+            return (a == b).astype(numpy.int64), None
+        raise NotImplementedError(kind)
+
+    def run(self):
+        """Run every lane; return the outputs, None for failed lanes."""
+        count = self.inputs.shape[0]
+        self.statements(self.program.body, numpy.ones(count, dtype=bool))
+        parts = [[] for _ in range(count)]
+        for lanes, values, booleans, newline in self.writes:
+            end = "\n" if newline else ""
+            if values is None:
+                for lane in lanes.tolist():
+                    parts[lane].append(end)
+                continue
+            if isinstance(booleans, bool):
+                booleans = [booleans] * len(lanes)
+            else:
+                booleans = booleans.tolist()
+            for lane, value, boolean in zip(lanes.tolist(), values.tolist(),
+                                            booleans):
+                parts[lane].append(str(bool(value) if boolean else value) +
+                                   end)
+        slots = dict((name, slot)
+                     for slot, name in enumerate(self.program.names))
+        for identifier in self.program.decls:
+            unset = numpy.nonzero(~self.defined[slots[identifier.name]])[0]
+            for lane in unset.tolist():
+                parts[lane].append("Warning: identifier %s not used.\n" %
+                                   identifier.name)
+        return [None if failed else "".join(lane_parts)
+                for failed, lane_parts in zip(self.failed.tolist(), parts)]
+
+
+class VectorProgram(object):
+    def __init__(self, program):
+        self.program = program
+        self.scalar = embed.Executable(program.name, "tree", program)
+        self.vectorizable = fits_int64(program.body)
+
+    def run_scalar(self, inputs):
+        try:
+            return self.scalar.run(inputs)
+        except Exception as e:
+            return e
+
+    def run(self, inputs):
+        """The output of every row of `inputs`, one row of values per lane."""
+        if numpy is None or not self.vectorizable:
+            return [self.run_scalar(list(row)) for row in inputs]
+        inputs = numpy.asarray(inputs, dtype=numpy.int64)
+        if inputs.ndim != 2:
+            raise ValueError("Inputs must have one row per lane")
+        outputs = VectorRun(self.program, inputs).run()
+        for lane, output in enumerate(outputs):
+            if output is None:
+                outputs[lane] = self.run_scalar(inputs[lane].tolist())
+        return outputs
+
+
+def compile(source, optimize=False):
+    return VectorProgram(cache.prepare(source, "tree", optimize))
@@ -0,0 +1,314 @@
+"""A bytecode compiler and virtual machine for meeny programs.
+
+`compile_program` flattens a parsed `ast.Program` into a list of integers
+laid out as fixed-width (opcode, a, b, c) instructions, and `Code.run`
+executes it in a single dispatch loop. Operands are indices into one frame
+list holding the declared variables, the constants and the temporaries of
+intermediate results; jumps keep their target position in `c`.
+
+Addressing operands directly in the frame keeps the dispatch count down to one
+per operator, which matters more in CPython than anything else the loop does.
+Results, including the final contents of the context, match
+`ast.Program.eval`.
+"""
+import attr
+
+import ast
+import output
+import reader
+
+
+(MOVE, ADD, SUBTRACT, MULTIPLY, DIVIDE, MODULO, GREATER_THAN, EQUAL_TO,
+ JUMP, JUMP_IF_FALSE, JUMP_IF_TRUE, JUMP_IF_GREATER, JUMP_UNLESS_GREATER,
+ JUMP_IF_EQUAL, JUMP_UNLESS_EQUAL, READ, WRITE, WRITE_EMPTY, HALT) = range(19)
+
+opnames = ["MOVE", "ADD", "SUBTRACT", "MULTIPLY", "DIVIDE", "MODULO",
+           "GREATER_THAN", "EQUAL_TO", "JUMP", "JUMP_IF_FALSE", "JUMP_IF_TRUE",
+           "JUMP_IF_GREATER", "JUMP_UNLESS_GREATER", "JUMP_IF_EQUAL",
+           "JUMP_UNLESS_EQUAL", "READ", "WRITE", "WRITE_EMPTY", "HALT"]
+
+WIDTH = 4
+
+binary_opcodes = {
+    ast.Add: ADD,
+    ast.Subtract: SUBTRACT,
+    ast.Multiply: MULTIPLY,
+    ast.Divide: DIVIDE,
+    ast.Modulo: MODULO,
+    ast.GreaterThan: GREATER_THAN,
+    ast.EqualTo: EQUAL_TO,
+}
+
+# Compare-and-branch forms for conditions, as (jump if true, jump if false).
+conditional_jumps = {
+    ast.GreaterThan: (JUMP_IF_GREATER, JUMP_UNLESS_GREATER),
+    ast.EqualTo: (JUMP_IF_EQUAL, JUMP_UNLESS_EQUAL),
+}
+
+
+@attr.s
+class Code(object):
+    name = attr.ib()
+    instructions = attr.ib()
+    names = attr.ib()
+    initial = attr.ib()
+    declared = attr.ib()
+
+    def slot_name(self, slot):
+        if slot < len(self.names):
+            return self.names[slot]
+        value = self.initial[slot]
+        return repr(value) if value is not None else "t%d" % slot
+
+    def disassemble(self):
+        lines = []
+        code = self.instructions
+        for pc in range(0, len(code), WIDTH):
+            op, a, b, c = code[pc:pc + WIDTH]
+            if op == MOVE:
+                operands = [self.slot_name(a), self.slot_name(b)]
+            elif op in (JUMP_IF_GREATER, JUMP_UNLESS_GREATER, JUMP_IF_EQUAL,
+                        JUMP_UNLESS_EQUAL):
+                operands = [self.slot_name(a), self.slot_name(b), str(c)]
+            elif op in (JUMP_IF_FALSE, JUMP_IF_TRUE):
+                operands = [self.slot_name(a), str(c)]
+            elif op == JUMP:
+                operands = [str(c)]
+            elif op in (READ, WRITE):
+                operands = [self.slot_name(a)]
+            elif op in (WRITE_EMPTY, HALT):
+                operands = []
+            else:
+                operands = [self.slot_name(a), self.slot_name(b),
+                            self.slot_name(c)]
+            lines.append("%4d %-20s %s" % (pc, opnames[op], ", ".join(operands)))
+        return "\n".join(lines)
+
+    def run(self, context):
+        frame = list(self.initial)
+        sink = output.sink
+        write = sink.write
+        try:
+            self.execute(frame, write, reader.source.read)
+            for slot, name in enumerate(self.names):
+                context[name] = frame[slot]
+            for slot in self.declared:
+                if frame[slot] is None:
+                    write("Warning: identifier %s not used.\n" %
+                          self.names[slot])
+        finally:
+            sink.flush()
+
+    def execute(self, frame, write, read):
+        code = self.instructions
+        names = self.names
+        pc = 0
+        while True:
+            op, a, b, c = code[pc:pc + 4]
+            pc += 4
+            if op == ADD:
+                frame[a] = frame[b] + frame[c]
+            elif op == SUBTRACT:
+                frame[a] = frame[b] - frame[c]
+            elif op == JUMP_IF_GREATER:
+                if frame[a] > frame[b]:
+                    pc = c
+            elif op == JUMP_UNLESS_GREATER:
+                if not frame[a] > frame[b]:
+                    pc = c
+            elif op == MULTIPLY:
+                frame[a] = frame[b] * frame[c]
+            elif op == MOVE:
+                frame[a] = frame[b]
+            elif op == MODULO:
+                frame[a] = frame[b] % frame[c]
+            elif op == DIVIDE:
+                frame[a] = frame[b] // frame[c]
+            elif op == JUMP_IF_EQUAL:
+                if frame[a] == frame[b]:
+                    pc = c
+            elif op == JUMP_UNLESS_EQUAL:
+                if not frame[a] == frame[b]:
+                    pc = c
+            elif op == JUMP:
+                pc = c
+            elif op == JUMP_IF_TRUE:
+                if frame[a]:
+                    pc = c
+            elif op == JUMP_IF_FALSE:
+                if not frame[a]:
+                    pc = c
+            elif op == GREATER_THAN:
+                frame[a] = frame[b] > frame[c]
+            elif op == EQUAL_TO:
+                frame[a] = frame[b] == frame[c]
+            elif op == WRITE:
+                write(str(frame[a]) + ("\n" if b else ""))
+            elif op == WRITE_EMPTY:
+                write("\n" if a else "")
+            elif op == READ:
+                frame[a] = int(read("Value for %s: " % names[a]))
+            elif op == HALT:
+                break
+            else:
+                raise AssertionError("Unknown opcode %d" % op)
+
+
+class Compiler(object):
+    def __init__(self, program):
+        self.program = program
+        self.instructions = []
+        self.names = []
+        self.slots = {}
+        self.declared = []
+        self.constants = []
+        self.constant_slots = {}
+        self.temporaries = 0
+        self.depth = 0
+
+    def emit(self, op, a=0, b=0, c=0):
+        self.instructions.extend((op, a, b, c))
+        return len(self.instructions) - WIDTH
+
+    def patch(self, position, target):
+        self.instructions[position + 3] = target
+
+    def here(self):
+        return len(self.instructions)
+
+    def slot(self, name):
+        assert name in self.slots, "Undeclared identifier %s" % name
+        return self.slots[name]
+
+    def compile(self):
+        initial = []
+        for identifier in self.program.decls:
+            if identifier.name not in self.slots:
+                self.slots[identifier.name] = len(self.names)
+                self.names.append(identifier.name)
+                initial.append(identifier.value)
+            else:
+                initial[self.slots[identifier.name]] = identifier.value
+            self.declared.append(self.slots[identifier.name])
+        self.statements(self.program.body)
+        self.emit(HALT)
+
+        # Constants and temporaries follow the variables in the frame.
+        variables = len(self.names)
+        constants = len(self.constants)
+        relocated = []
+        for position in range(0, len(self.instructions), WIDTH):
+            op = self.instructions[position]
+            for operand in self.operand_slots(op):
+                relocated.append(position + operand)
+        for position in relocated:
+            slot = self.instructions[position]
+            if slot < 0:
+                self.instructions[position] = variables + (-slot - 1)
+            elif slot >= self.base:
+                self.instructions[position] = (
+                    variables + constants + slot - self.base)
+        frame = initial + self.constants + [None] * self.temporaries
+        return Code(self.program.name, self.instructions, self.names, frame,
+                    self.declared)
+
+    @staticmethod
+    def operand_slots(op):
+        if op in (JUMP, WRITE_EMPTY, HALT):
+            return ()
+        elif op in (JUMP_IF_FALSE, JUMP_IF_TRUE, READ, WRITE):
+            return (1,)
+        elif op in (MOVE, JUMP_IF_GREATER, JUMP_UNLESS_GREATER, JUMP_IF_EQUAL,
+                    JUMP_UNLESS_EQUAL):
+            return (1, 2)
+        return (1, 2, 3)
+
+    # Until `compile` lays out the frame, constants are numbered -1, -2, ...
+    # and temporaries from `base` upwards, which no variable can reach.
+    base = 1 << 30
+
+    def constant(self, value):
+        key = (type(value), value)
+        if key not in self.constant_slots:
+            self.constants.append(value)
+            self.constant_slots[key] = -len(self.constants)
+        return self.constant_slots[key]
+
+    def temporary(self):
+        slot = self.base + self.depth
+        self.depth += 1
+        self.temporaries = max(self.temporaries, self.depth)
+        return slot
+
+    def statements(self, statements):
+        for statement in statements or ():
+            self.statement(statement)
+
+    def statement(self, node):
+        if isinstance(node, ast.Assignment):
+            target = self.slot(node.identifier.name)
+            if type(node.value) in binary_opcodes:
+                self.binary(node.value, target)
+            else:
+                self.emit(MOVE, target, self.expression(node.value))
+        elif isinstance(node, ast.ReadStatement):
+            self.emit(READ, self.slot(node.target.name))
+        elif isinstance(node, ast.WriteStatement):
+            if node.value:
+                self.emit(WRITE, self.expression(node.value),
+                          int(bool(node.newline)))
+            else:
+                self.emit(WRITE_EMPTY, int(bool(node.newline)))
+        elif isinstance(node, ast.WhileStatement):
+            enter = self.emit(JUMP)
+            body = self.here()
+            self.statements(node.body)
+            self.patch(enter, self.here())
+            self.branch(node.condition, True, body)
+        elif isinstance(node, ast.IfStatement):
+            skip = self.branch(node.condition, False)
+            self.statements(node.body)
+            if node.else_body:
+                done = self.emit(JUMP)
+                self.patch(skip, self.here())
+                self.statements(node.else_body)
+                self.patch(done, self.here())
+            else:
+                self.patch(skip, self.here())
+        else:
+            raise NotImplementedError(node.__class__)
+        self.depth = 0
+
+    def branch(self, condition, when, target=0):
+        """Emit a jump to `target` taken when `condition` is `when`."""
+        if type(condition) in conditional_jumps:
+            left = self.expression(condition.left)
+            right = self.expression(condition.right)
+            op = conditional_jumps[type(condition)][0 if when else 1]
+            return self.emit(op, left, right, target)
+        value = self.expression(condition)
+        op = JUMP_IF_TRUE if when else JUMP_IF_FALSE
+        return self.emit(op, value, 0, target)
+
+    def expression(self, node):
+        if isinstance(node, ast.Number):
+            return self.constant(node.value)
+        elif isinstance(node, ast.IdentifierReference):
+            return self.slot(node.name)
+        elif type(node) in binary_opcodes:
+            return self.binary(node, None)
+        raise NotImplementedError(node.__class__)
+
+    def binary(self, node, target):
+        depth = self.depth
+        left = self.expression(node.left)
+        right = self.expression(node.right)
+        self.depth = depth
+        if target is None:
+            target = self.temporary()
+        self.emit(binary_opcodes[type(node)], target, left, right)
+        return target
+
+
+def compile_program(program):
+    return Compiler(program).compile()